@@ -0,0 +1,48 @@
+import ipaddress
+import random
+import time
+
+from unleash_client.strategy import DEFAULT_STRATEGIES
+
+
+def ranges(n, r):
+    result = []
+    for _ in range(n):
+        prefix = r.randint(16, 30)
+        shift = 32 - prefix
+        address = r.getrandbits(32) >> shift << shift
+        result.append(str(ipaddress.IPv4Network((address, prefix))))
+    return result
+
+
+def main(n=10000, lookups=100000):
+    r = random.Random(0)
+    blocks = ranges(n, r)
+    probes = [str(ipaddress.IPv4Address(r.getrandbits(32)))
+              for _ in range(lookups // 2)]
+    probes += [r.choice(blocks).split('/')[0] for _ in range(lookups // 2)]
+
+    t0 = time.perf_counter()
+    gate = DEFAULT_STRATEGIES['remoteAddress'](IPs=','.join(blocks))
+    t1 = time.perf_counter()
+    test = gate.contextual
+    hits = sum(test({'remote_addr': p}) for p in probes)
+    t2 = time.perf_counter()
+
+    networks = [ipaddress.ip_network(b) for b in blocks]
+    sample = probes[:200] + probes[-200:]
+    t3 = time.perf_counter()
+    for p in sample:
+        address = ipaddress.ip_address(p)
+        any(address in network for network in networks)
+    t4 = time.perf_counter()
+
+    print('%d ranges: build %.1f ms, trie %.0f ns/lookup (%.0f/s, %d hits), '
+          'linear scan %.0f us/lookup' % (
+              n, (t1 - t0) * 1e3, (t2 - t1) / len(probes) * 1e9,
+              len(probes) / (t2 - t1), hits, (t4 - t3) / len(sample) * 1e6))
+
+
+if __name__ == '__main__':
+    for n in (100, 10000):
+        main(n)
@@ -0,0 +1,31 @@
+import time
+
+from unleash_client.features import Feature, cohort
+from unleash_client.strategy import DEFAULT_STRATEGIES
+
+DEFINITION = {
+    'enabled': True,
+    'strategies': [
+        {'name': 'gradualRolloutUserId',
+         'parameters': {'groupId': 'campaign', 'percentage': '30'}},
+    ],
+}
+
+
+def main(n=1000000):
+    feature = Feature(DEFAULT_STRATEGIES, DEFINITION)
+    keys = ['user-%d' % i for i in range(n)]
+
+    t0 = time.perf_counter()
+    scalar = [feature.decide({'user_id': k}) for k in keys]
+    t1 = time.perf_counter()
+    bulk = cohort(feature, 'user_id', keys)
+    t2 = time.perf_counter()
+
+    assert bulk.tolist() == scalar
+    print('%d keys: scalar %.2fs, bulk %.2fs, speedup %.2fx' % (
+        n, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import json
+import time
+import tracemalloc
+
+from unleash_client.definitions import decode
+from unleash_client.util import FrozenDict
+
+
+def payload(n):
+    return json.dumps({'version': 1, 'features': [{
+        'name': 'feature-%d' % i,
+        'description': 'Feature number %d' % i,
+        'enabled': bool(i % 3),
+        'createdAt': '2017-01-01T00:00:00.000Z',
+        'strategies': [
+            {'name': 'userWithId',
+             'parameters': {'userIds': 'a,b,c,%d' % i}},
+            {'name': 'gradualRolloutUserId',
+             'parameters': {'groupId': 'g%d' % i, 'percentage': '25'}},
+        ],
+    } for i in range(n)]}).encode('utf-8')
+
+
+def object_hook(body):
+    return json.loads(body.decode('utf-8'), object_hook=FrozenDict)
+
+
+def measure(f, body, repeat=5):
+    best = min(_timed(f, body) for _ in range(repeat))
+    tracemalloc.start()
+    result = f(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, retained, peak
+
+
+def _timed(f, body):
+    t0 = time.perf_counter()
+    f(body)
+    return time.perf_counter() - t0
+
+
+def main(n=20000):
+    body = payload(n)
+    print('%d features, %.1f MB payload' % (n, len(body) / 1e6))
+    for name, f in [('object_hook', object_hook), ('decode', decode)]:
+        t, retained, peak = measure(f, body)
+        print('%-12s %7.1f ms  retained %6.1f MB  peak %6.1f MB' % (
+            name, t * 1e3, retained / 1e6, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import random
+import timeit
+import tracemalloc
+
+from benchmarks.suite import payload
+from unleash_client import Client
+
+
+def main(n=5000, number=200000):
+    definitions = payload(n)
+    client = Client(fetch=lambda: definitions, disable_metrics=True)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    features = client.compile(definitions['features'])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+    client.features = features
+    client.snapshot()
+
+    names = [random.choice(list(features)) for _ in range(1024)]
+    contexts = [{'user_id': 'u%d' % i} for i in range(1024)]
+    pairs = list(zip(names, contexts)) * (number // 1024)
+    enabled = client.enabled
+
+    def run():
+        for name, context in pairs:
+            enabled(name, context)
+
+    t = min(timeit.repeat(run, number=1, repeat=5))
+    print('%d features: %.0f bytes/feature, enabled() %.1f ns' % (
+        n, used / n, t / len(pairs) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
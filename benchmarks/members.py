@@ -0,0 +1,60 @@
+import json
+import time
+import tracemalloc
+from unittest import mock
+
+from unleash_client import Client
+from unleash_client import strategy
+from unleash_client.definitions import decode
+
+
+def payload(features, lists, size):
+    shared = [
+        ','.join('user-%d-%d' % (j, i) for i in range(size))
+        for j in range(lists)
+    ]
+    return decode(json.dumps({'version': 1, 'features': [{
+        'name': 'feature-%d' % i,
+        'enabled': True,
+        'strategies': [{
+            'name': 'userWithId',
+            'parameters': {'userIds': shared[i % lists]},
+        }],
+    } for i in range(features)]}))
+
+
+def measure(definitions, repeat=3):
+    client = Client(fetch=lambda: definitions, disable_metrics=True)
+    tracemalloc.start()
+    client.snapshot()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    best = float('inf')
+    for _ in range(repeat):
+        old, client.features = client.features, {}
+        t0 = time.perf_counter()
+        client.features = client.compile(definitions['features'])
+        del old
+        best = min(best, time.perf_counter() - t0)
+    return retained, best
+
+
+def main(features=200, lists=5, size=20000):
+    definitions = payload(features, lists, size)
+    print('%d features sharing %d lists of %d ids' % (features, lists, size))
+    fresh = mock.patch.object(
+        strategy, 'member_set', lambda raw: frozenset(raw.split(',')))
+    for name, patch in [('fresh sets', fresh), ('interned', None)]:
+        if patch:
+            patch.start()
+        try:
+            retained, rebuild = measure(definitions)
+        finally:
+            if patch:
+                patch.stop()
+        print('%-10s %8.1f MB retained, rebuild %8.1f ms' % (
+            name, retained / 1e6, rebuild * 1e3))
+
+
+if __name__ == '__main__':
+    main()
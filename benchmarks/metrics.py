@@ -0,0 +1,42 @@
+import threading
+import time
+
+from unleash_client.metrics import Tally
+
+
+class DictCounter:
+    def __init__(self):
+        self.choices = {False: 0, True: 0}
+
+    def __call__(self, result):
+        self.choices[result] += 1
+
+
+def hammer(count, threads, rounds):
+    def work():
+        for i in range(rounds):
+            count(i & 1 == 0)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - t0
+
+
+def main(threads=8, rounds=200000):
+    expected = threads * rounds
+    for name, make, total in [
+            ('dict', DictCounter, lambda c: sum(c.choices.values())),
+            ('tally', Tally, lambda c: sum(c.totals())),
+    ]:
+        counter = make()
+        elapsed = hammer(counter, threads, rounds)
+        print('%-6s %6.1f ns/eval, counted %d of %d' % (
+            name, elapsed / expected * 1e9, total(counter), expected))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import timeit
+from hashlib import md5
+
+from unleash_client import strategy
+
+
+def hexdigest(key, group):
+    value = '%s:%s' % (group, key)
+    end = md5(value.encode('utf-8')).hexdigest()[-4:]
+    return int(end, 16) % 100
+
+
+def main(number=200000, users=1000):
+    keys = ['user-%d' % (i % users) for i in range(number)]
+    cached = strategy.cache_normalize(users)
+    try:
+        for name, f in [
+                ('hexdigest', hexdigest),
+                ('digest', strategy.bucket),
+                ('cached', cached),
+        ]:
+            t = min(timeit.repeat(
+                lambda: [f(k, 'group') for k in keys], number=1, repeat=3))
+            print('%-10s %8.1f ns/call' % (name, t / number * 1e9))
+        print(strategy.normalize_cache_info())
+    finally:
+        strategy.cache_normalize(0)
+
+
+if __name__ == '__main__':
+    main()
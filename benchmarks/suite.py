@@ -0,0 +1,285 @@
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from unleash_client import Client
+from unleash_client.context import UnleashContext
+from unleash_client.definitions import decode
+from unleash_client.features import Feature
+from unleash_client.io import Reporter, Scheduler
+from unleash_client.strategy import DEFAULT_STRATEGIES, bucket
+
+PARAMETERS = {
+    'applicationHostname': {'hostNames': 'h1,h2,h3'},
+    'default': {},
+    'gradualRolloutRandom': {'percentage': '50'},
+    'gradualRolloutSessionId': {'groupId': 'g', 'percentage': '50'},
+    'gradualRolloutUserId': {'groupId': 'g', 'percentage': '50'},
+    'remoteAddress': {'IPs': '10.0.0.1,10.0.0.2'},
+    'userWithId': {'userIds': 'a,b,c'},
+}
+
+CONTEXT = {
+    'user_id': 'someone',
+    'session_id': 's-1',
+    'remote_addr': '10.1.1.1',
+    'host': 'h4',
+}
+
+FEATURES = {
+    'disabled': {
+        'enabled': False,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    },
+    'default': {
+        'enabled': True,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    },
+    'userWithId': {
+        'enabled': True,
+        'strategies': [
+            {'name': 'userWithId', 'parameters': {'userIds': 'a,b,c'}},
+        ],
+    },
+    'gradualRolloutUserId': {
+        'enabled': True,
+        'strategies': [
+            {'name': 'gradualRolloutUserId',
+             'parameters': {'groupId': 'g', 'percentage': '50'}},
+        ],
+    },
+    'mixed': {
+        'enabled': True,
+        'strategies': [
+            {'name': 'userWithId', 'parameters': {'userIds': 'a,b,c'}},
+            {'name': 'remoteAddress', 'parameters': {'IPs': '10.0.0.1'}},
+            {'name': 'gradualRolloutUserId',
+             'parameters': {'groupId': 'g', 'percentage': '50'}},
+        ],
+    },
+}
+
+
+class LegacyFeature(Feature):
+    def __call__(self, context):
+        result = self.enabled and any(g(**context) for g in self.gates)
+        next(self.counters[result])
+        return result
+
+
+def payload(n):
+    return {'version': 1, 'features': [{
+        'name': 'feature-%d' % i,
+        'enabled': True,
+        'strategies': [
+            {'name': 'userWithId',
+             'parameters': {'userIds': 'a,b,c,%d' % i}},
+            {'name': 'gradualRolloutUserId',
+             'parameters': {'groupId': 'g%d' % i, 'percentage': '25'}},
+        ],
+    } for i in range(n)]}
+
+
+def offline(definitions):
+    return Client(fetch=lambda: definitions, disable_metrics=True)
+
+
+def timed(f, number, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f(number)
+        best = min(best, time.perf_counter() - t0)
+    return best / number
+
+
+def strategy_case(name):
+    client = offline({'features': [{
+        'name': name,
+        'enabled': True,
+        'strategies': [{'name': name, 'parameters': PARAMETERS[name]}],
+    }]})
+    enabled = client.enabled
+
+    def run(number):
+        for _ in range(number):
+            enabled(name, CONTEXT)
+    return run
+
+
+def feature_case(cls, definition):
+    feature = cls(DEFAULT_STRATEGIES, definition)
+
+    def run(number):
+        for _ in range(number):
+            feature(CONTEXT)
+    return run
+
+
+def normalize_case(number):
+    for i in range(number):
+        bucket(i, 'group')
+
+
+def rebuild_case(n):
+    definitions = decode(json.dumps(payload(n)).encode('utf-8'))
+    client = offline(definitions)
+
+    def run(number):
+        for _ in range(number):
+            client.features = {}
+            client.compile(definitions['features'])
+    return run
+
+
+def flush_case(n=1000):
+    client = offline(payload(n))
+    names = list(client.snapshot())
+    reporter = Reporter(client, 'http://localhost/', 60,
+                        scheduler=Scheduler(background=False))
+    reporter.post = lambda report: SimpleNamespace(ok=True)
+
+    def run(number):
+        for _ in range(number):
+            for name in names:
+                client.enabled(name, CONTEXT)
+            reporter.step()
+    return run
+
+
+def scoped_case(checks=10):
+    client = offline(payload(100))
+
+    def run(number):
+        for _ in range(number):
+            scope = client.scoped(CONTEXT)
+            for _ in range(checks):
+                scope.enabled('feature-1')
+    return run
+
+
+def context_case(make, rollouts=30, checks=3):
+    client = offline({'features': [{
+        'name': 'rollout-%d' % i,
+        'enabled': True,
+        'strategies': [{
+            'name': 'gradualRolloutUserId',
+            'parameters': {'groupId': 'rollout-%d' % i, 'percentage': '50'},
+        }],
+    } for i in range(rollouts)]})
+    names = list(client.snapshot())
+    enabled = client.enabled
+
+    def run(number):
+        for _ in range(number):
+            context = make(CONTEXT)
+            for _ in range(checks):
+                for name in names:
+                    enabled(name, context)
+    return run
+
+
+def threads_case(threads):
+    client = offline(payload(100))
+    names = list(client.snapshot())
+
+    def work(number):
+        enabled = client.enabled
+        for i in range(number):
+            enabled(names[i % 100], CONTEXT)
+
+    def run(number):
+        workers = [
+            threading.Thread(target=work, args=(number // threads,))
+            for _ in range(threads)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    return run
+
+
+def cases():
+    for name in sorted(DEFAULT_STRATEGIES):
+        yield 'strategy/%s' % name, strategy_case(name), 100000
+    for name, definition in FEATURES.items():
+        for prefix, cls in (('legacy', LegacyFeature), ('plan', Feature)):
+            case = feature_case(cls, definition)
+            yield '%s/%s' % (prefix, name), case, 100000
+    yield 'normalize', normalize_case, 100000
+    for n in (100, 1000, 10000):
+        yield 'rebuild/%d' % n, rebuild_case(n), max(1, 10000 // n)
+    yield 'flush/1000', flush_case(), 10
+    yield 'scoped/10', scoped_case(), 10000
+    for name, make in (('dict', dict), ('object', UnleashContext)):
+        for checks in (1, 3):
+            case = context_case(make, checks=checks)
+            yield 'context/%s/30x%d' % (name, checks), case, 500
+    for threads in (1, 2, 4, 8):
+        yield 'threads/%d' % threads, threads_case(threads), 80000
+
+
+def run(selected=None, repeat=5):
+    results = {}
+    for name, f, number in cases():
+        if selected and not any(name.startswith(s) for s in selected):
+            continue
+        results[name] = timed(f, number, repeat)
+        print('%-36s %12.3f us' % (name, results[name] * 1e6))
+    return results
+
+
+def speedups(results):
+    return [
+        (name[5:], results['legacy/' + name[5:]] / t)
+        for name, t in results.items()
+        if name.startswith('plan/') and 'legacy/' + name[5:] in results
+    ]
+
+
+def compare(baseline, results, tolerance):
+    return sorted(
+        (name, baseline[name], t) for name, t in results.items()
+        if name in baseline and t > baseline[name] * (1 + tolerance)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('cases', nargs='*', help='case name prefixes')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.repeat)
+    for name, speedup in speedups(results):
+        print('speedup %-28s %12.2fx' % (name, speedup))
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, fh, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)['results']
+        slower = compare(baseline, results, args.tolerance)
+        for name, before, after in slower:
+            print('SLOWER %-29s %10.3f -> %10.3f us (+%.0f%%)' % (
+                name, before * 1e6, after * 1e6, (after / before - 1) * 100))
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
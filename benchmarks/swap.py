@@ -0,0 +1,37 @@
+import copy
+import time
+
+from benchmarks.suite import payload
+from unleash_client import Client
+from unleash_client.features import Feature
+
+
+def full_rebuild(client, definitions):
+    ts = [Feature(client.strategies, f) for f in definitions['features']]
+    return {t.feature['name']: t for t in ts}
+
+
+def main(n=10000, repeat=5):
+    old = payload(n)
+    client = Client(fetch=lambda: old, disable_metrics=True)
+    base = client.snapshot()
+
+    new = copy.deepcopy(old)
+    new['features'][n // 2]['enabled'] = False
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        full_rebuild(client, new)
+    t1 = time.perf_counter()
+    for _ in range(repeat):
+        client.features = base
+        client.compile(new['features'])
+    t2 = time.perf_counter()
+
+    full, incremental = (t1 - t0) / repeat, (t2 - t1) / repeat
+    print('%d features, one flipped: full %.1f ms, incremental %.1f ms '
+          '(%.1fx)' % (n, full * 1e3, incremental * 1e3, full / incremental))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+def toggle(name, enabled=True):
+    return {
+        'name': name,
+        'enabled': enabled,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    }
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
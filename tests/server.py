@@ -0,0 +1,142 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *al):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in.connections += 1
+
+    def reply(self, status, body=b'', headers=()):
+        if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers = list(headers) + [('Content-Encoding', 'gzip')]
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stand_in.sent += len(body)
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        stand_in.requests.append(('GET', self.path, dict(self.headers)))
+        time.sleep(stand_in.delay)
+        if self.path == '/api/client/streaming':
+            return self.stream()
+        if self.path != '/api/features':
+            return self.reply(404)
+        if self.headers.get('If-None-Match') == stand_in.etag:
+            return self.reply(304)
+        body = json.dumps(stand_in.features).encode('utf-8')
+        self.reply(200, body, [
+            ('Content-Type', 'application/json'),
+            ('ETag', stand_in.etag),
+        ])
+
+    def chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def stream(self):
+        stand_in = self.server.stand_in
+        if not stand_in.streaming:
+            return self.reply(404)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        with stand_in.changed:
+            generation, seen = stand_in.generation, len(stand_in.events)
+            pending = [('features', stand_in.features)]
+        while pending is not None:
+            for name, data in pending:
+                self.chunk(('event: %s\ndata: %s\n\n' % (
+                    name, json.dumps(data))).encode('utf-8'))
+            with stand_in.changed:
+                stand_in.changed.wait(0.05)
+                if stand_in.generation != generation:
+                    pending = None
+                else:
+                    pending = stand_in.events[seen:]
+                    seen += len(pending)
+        self.chunk(b'')
+        self.close_connection = True
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        stand_in.requests.append(('POST', self.path, dict(self.headers)))
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if self.path != '/api/client/metrics':
+            return self.reply(404)
+        if stand_in.failures:
+            stand_in.failures -= 1
+            return self.reply(503)
+        stand_in.metrics.append(json.loads(body.decode('utf-8')))
+        self.reply(202)
+
+
+class StandIn:
+    def __init__(self, features=None):
+        self.features = features or {'version': 1, 'features': []}
+        self.etag = '"1"'
+        self.requests = []
+        self.metrics = []
+        self.sent = 0
+        self.connections = 0
+        self.delay = 0
+        self.failures = 0
+        self.streaming = False
+        self.events = []
+        self.generation = 0
+        self.changed = threading.Condition()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={'poll_interval': 0.01},
+        )
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server.server_address
+
+    def publish(self, features):
+        self.features = features
+        self.etag = '"%d"' % (int(self.etag.strip('"')) + 1)
+        self.push('features', features)
+
+    def push(self, event, data):
+        with self.changed:
+            self.events.append((event, data))
+            self.changed.notify_all()
+
+    def disconnect(self):
+        with self.changed:
+            self.generation += 1
+            self.changed.notify_all()
+
+    def count(self, method, path):
+        return sum(1 for m, p, _ in self.requests if (m, p) == (method, path))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.disconnect()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
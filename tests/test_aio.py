@@ -0,0 +1,91 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from unleash_client import AsyncClient
+
+from .server import StandIn
+
+example = {
+    'version': 1,
+    'features': [{
+        'enabled': True,
+        'name': 'foo',
+        'strategies': [{'parameters': {}, 'name': 'default'}],
+    }],
+}
+
+
+class TestAsyncClient(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = StandIn(example).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    async def test_lifecycle(self):
+        async with AsyncClient(
+                self.server.url,
+                refresh_interval=0.05,
+                metrics_interval=60,
+        ) as c:
+            assert c.enabled('foo', {})
+            assert not c.enabled('bar', {})
+
+        assert self.server.count('GET', '/api/features') >= 1
+        assert len(self.server.metrics) == 1
+        toggles = self.server.metrics[0]['bucket']['toggles']
+        assert toggles['foo'] == {'yes': 1, 'no': 0}
+        assert not c.tasks
+
+    async def test_enabled_never_blocks_before_first_fetch(self):
+        c = AsyncClient(self.server.url, disable_metrics=True)
+        assert not c.enabled('foo', {})
+        assert self.server.count('GET', '/api/features') == 0
+
+    async def test_background_refresh(self):
+        c = AsyncClient(
+            self.server.url,
+            refresh_interval=0.02,
+            disable_metrics=True,
+        )
+        await c.start(wait=False)
+        try:
+            for _ in range(100):
+                if c.enabled('foo', {}):
+                    break
+                await asyncio.sleep(0.01)
+            assert c.enabled('foo', {})
+
+            self.server.publish({'version': 1, 'features': []})
+            for _ in range(100):
+                if not c.enabled('foo', {}):
+                    break
+                await asyncio.sleep(0.01)
+            assert not c.enabled('foo', {})
+        finally:
+            await c.close()
+
+    async def test_streaming(self):
+        self.server.streaming = True
+        async with AsyncClient(
+                self.server.url,
+                streaming=True,
+                disable_metrics=True,
+        ) as c:
+            thread = c.fetcher.thread
+            for _ in range(500):
+                if c.fetcher.connected.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            assert c.fetcher.connected.is_set()
+            assert self.server.count('GET', '/api/client/streaming') == 1
+
+            self.server.publish({'version': 1, 'features': []})
+            for _ in range(500):
+                if not c.enabled('foo', {}):
+                    break
+                await asyncio.sleep(0.01)
+            assert not c.enabled('foo', {})
+
+        thread.join(5)
+        assert not thread.is_alive()
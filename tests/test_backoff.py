@@ -0,0 +1,104 @@
+import collections
+import email.utils
+import random
+import time
+from requests import exceptions
+from unittest import mock, TestCase
+
+from unleash_client.io import Scheduler, UrlFetcher, retry_after
+
+from .helpers import Clock
+
+
+def response(status, headers=None):
+    res = mock.Mock(status_code=status, ok=status < 400, headers=headers or {})
+    res.raise_for_status.side_effect = exceptions.HTTPError(status)
+    return res
+
+
+class TestPollScheduling(TestCase):
+    def setUp(self):
+        random.seed(25)
+        self.clock = Clock()
+        self.scheduler = Scheduler(self.clock, background=False)
+        self.session = mock.Mock()
+        self.session.get.side_effect = self.get
+        self.polls = []
+        self.status = 304
+        self.headers = {}
+
+    def get(self, **kw):
+        self.polls.append(self.clock.now)
+        return response(self.status, self.headers)
+
+    def fetcher(self, interval=60, **kw):
+        fetch = UrlFetcher('http://unleash/api/features', interval,
+                           clock=self.clock, scheduler=self.scheduler,
+                           session=self.session, **kw)
+        fetch()
+        return fetch
+
+    def run_until(self, end):
+        while self.clock.now < end:
+            self.clock.now += 1
+            self.scheduler.run_pending()
+
+    def peak(self, start):
+        return max(collections.Counter(
+            int(t) for t in self.polls if t >= start).values())
+
+    def test_jitter_spreads_synchronized_starts(self):
+        for _ in range(200):
+            self.fetcher(jitter=0)
+        self.run_until(600)
+        assert self.peak(1) == 200
+
+        self.polls = []
+        self.scheduler = Scheduler(self.clock, background=False)
+        for _ in range(200):
+            self.fetcher(jitter=0.2)
+        self.run_until(1200)
+        assert len(self.polls) >= 200 * 10
+        assert self.peak(700) < 40
+
+    def test_exponential_backoff_is_capped(self):
+        self.status = 500
+        self.fetcher(interval=10, max_backoff=60)
+        self.run_until(180)
+        assert self.polls == [0, 20, 60, 120, 180]
+
+        self.status = 304
+        self.run_until(260)
+        assert self.polls[5:] == [240, 250, 260]
+
+    def test_many_failures(self):
+        self.status = 500
+        fetch = self.fetcher(interval=0.5, max_backoff=60)
+        fetch.failures = 1100
+        assert fetch.next_delay() == 60
+
+        fetch.next_delay = mock.Mock(side_effect=OverflowError)
+        with self.assertLogs('unleash_client.io', 'ERROR'):
+            self.run_until(1)
+        fetch.next_delay = lambda: 10
+        self.run_until(12)
+        assert self.polls == [0, 1, 2, 12]
+
+    def test_retry_after(self):
+        self.status = 503
+        self.headers = {'Retry-After': '300'}
+        self.fetcher(interval=10, jitter=0.2)
+        self.run_until(299)
+        assert self.polls == [0]
+        self.run_until(300)
+        assert self.polls == [0, 300]
+
+
+class TestRetryAfter(TestCase):
+    def test_parse(self):
+        assert retry_after('120') == 120
+        assert retry_after(None) == 0
+        assert retry_after('soon') == 0
+        assert retry_after('-5') == 0
+        when = email.utils.formatdate(time.time() + 60, usegmt=True)
+        assert 55 < retry_after(when) <= 60
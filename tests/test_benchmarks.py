@@ -0,0 +1,33 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmarks import suite
+
+
+class TestSuite(TestCase):
+    def test_compare(self):
+        baseline = {'a': 1.0, 'b': 1.0, 'gone': 1.0}
+        results = {'a': 1.2, 'b': 1.5, 'new': 9.0}
+        assert suite.compare(baseline, results, 0.3) == [('b', 1.0, 1.5)]
+
+    def test_speedups(self):
+        results = {'legacy/a': 3.0, 'plan/a': 1.0, 'plan/b': 1.0}
+        assert suite.speedups(results) == [('a', 3.0)]
+
+    def test_save_and_compare(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.unlink, path)
+        os.close(fd)
+
+        args = ['strategy/default', '--repeat', '1']
+        assert suite.main(args + ['--save', path]) == 0
+        with open(path) as fh:
+            saved = json.load(fh)
+        assert list(saved['results']) == ['strategy/default']
+
+        saved['results']['strategy/default'] /= 1000
+        with open(path, 'w') as fh:
+            json.dump(saved, fh)
+        assert suite.main(args + ['--compare', path]) == 1
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from unleash_client import Client
+
+from .helpers import toggle
+from .server import StandIn
+
+
+bootstrap = {'version': 1, 'features': [toggle('foo', True)]}
+served = {
+    'version': 1,
+    'features': [toggle('foo', False), toggle('bar', True)],
+}
+
+
+class TestBootstrap(TestCase):
+    def setUp(self):
+        self.server = StandIn(served).__enter__()
+        self.server.delay = 0.3
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def client(self, **kw):
+        c = Client(self.server.url, disable_metrics=True, **kw)
+        self.addCleanup(c.close)
+        return c
+
+    def test_answers_from_bootstrap_without_blocking(self):
+        t0 = time.monotonic()
+        c = self.client(bootstrap=bootstrap)
+        assert c.enabled('foo', {})
+        assert not c.enabled('bar', {})
+        assert time.monotonic() - t0 < self.server.delay
+
+        assert c.wait_ready(5)
+        assert not c.enabled('foo', {})
+        assert c.enabled('bar', {})
+
+    def test_bootstrap_file(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(bootstrap, fh)
+
+        c = self.client(bootstrap=path)
+
+        assert c.enabled('foo', {})
+        assert c.wait_ready(5)
+        assert c.enabled('bar', {})
+
+    def test_wait_ready_times_out(self):
+        c = self.client(bootstrap=bootstrap)
+        assert not c.wait_ready(0.01)
+        assert c.enabled('foo', {})
+
+    def test_unreachable_server_keeps_bootstrap(self):
+        c = Client('http://127.0.0.1:1', disable_metrics=True,
+                   bootstrap=bootstrap)
+        self.addCleanup(c.close)
+        assert not c.wait_ready(0.5)
+        assert c.enabled('foo', {})
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from unleash_client import Client
+from unleash_client.io import UrlFetcher, cache_path
+
+from .server import StandIn
+
+served = {
+    'version': 1,
+    'features': [{
+        'name': 'foo',
+        'enabled': True,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    }],
+}
+
+
+class TestDiskCache(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.server = StandIn(served).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def client(self, url=None):
+        c = Client(url or self.server.url, disable_metrics=True,
+                   cache_dir=self.cache_dir)
+        self.addCleanup(c.close)
+        return c
+
+    def test_restart_costs_one_304(self):
+        assert self.client().enabled('foo', {})
+        first = self.server.sent
+        assert first > 0
+        assert os.listdir(self.cache_dir) == [
+            os.path.basename(cache_path(
+                self.cache_dir, self.server.url + '/api/features'))
+        ]
+
+        assert self.client().enabled('foo', {})
+
+        assert self.server.sent == first
+        method, path, headers = self.server.requests[-1]
+        assert headers['If-None-Match'] == self.server.etag
+
+    def test_restart_while_server_is_down(self):
+        assert self.client().enabled('foo', {})
+        url = self.server.url
+        self.server.__exit__(None, None, None)
+        self.server = StandIn(served)
+
+        c = Client(url, disable_metrics=True, cache_dir=self.cache_dir)
+        self.addCleanup(c.close)
+
+        assert c.enabled('foo', {})
+
+    def test_changed_payload_replaces_cache(self):
+        assert self.client().enabled('foo', {})
+        self.server.publish({'version': 1, 'features': []})
+
+        assert not self.client().enabled('foo', {})
+        assert not self.client().enabled('foo', {})
+        assert self.server.count('GET', '/api/features') == 3
+
+    def test_corrupt_cache_is_ignored(self):
+        fetcher = UrlFetcher(self.server.url + '/api/features', 60,
+                             cache_dir=self.cache_dir)
+        with open(fetcher.cache_path, 'w') as fh:
+            fh.write('{"etag": "x", "feat')
+
+        assert fetcher()['features'][0]['name'] == 'foo'
+        fetcher.stop()
+        assert not [n for n in os.listdir(self.cache_dir)
+                    if n.endswith('.tmp')]
+
+    def test_cache_is_utf8_bytes(self):
+        fetcher = UrlFetcher(self.server.url + '/api/features', 60,
+                             cache_dir=self.cache_dir)
+        content = json.dumps({'version': 1, 'features': [
+            dict(served['features'][0], name='blåbær'),
+        ]}, ensure_ascii=False).encode('utf-8')
+        fetcher.save('"2"', content)
+
+        with open(fetcher.cache_path, 'rb') as fh:
+            assert content in fh.read()
+        features = fetcher.restore(None)
+        assert features['features'][0]['name'] == 'blåbær'
+        assert fetcher.etag == '"2"'
@@ -0,0 +1,197 @@
+from unittest import mock, TestCase
+
+from unleash_client import Client, DummyClient
+
+example = {
+    'features': [{
+        'enabled': True,
+        'name': 'foo',
+        'strategies': [{'parameters': {}, 'name': 'default'}],
+    }, {
+        'enabled': True,
+        'name': 'bar',
+        'strategies': [
+            {'parameters': {'userIds': 'able'}, 'name': 'userWithId'},
+        ],
+    }, {
+        'enabled': False,
+        'name': 'baz',
+        'strategies': [{'parameters': {}, 'name': 'default'}],
+    }],
+}
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.fetch = mock.Mock(return_value=example)
+        self.client = Client(fetch=self.fetch, disable_metrics=True)
+
+    def test_enabled_many(self):
+        result = self.client.enabled_many(
+            ['foo', 'bar', 'absent'], {'user_id': 'able'})
+
+        assert result == {'foo': True, 'bar': True, 'absent': False}
+        assert self.fetch.call_count == 1
+
+    def test_evaluate_all(self):
+        result = self.client.evaluate_all({'user_id': 'baker'})
+
+        assert result == {'foo': True, 'bar': False, 'baz': False}
+        assert self.fetch.call_count == 1
+
+    def test_batch_counts_metrics(self):
+        self.client.enabled_many(['foo', 'bar'], {'user_id': 'able'})
+        self.client.evaluate_all({'user_id': 'baker'})
+
+        features = self.client.features
+        assert features['foo'].choices == {True: 2, False: 0}
+        assert features['bar'].choices == {True: 1, False: 1}
+        assert features['baz'].choices == {True: 0, False: 1}
+
+    def test_dummy(self):
+        dummy = DummyClient()
+        assert dummy.enabled_many(['foo'], {}) == {'foo': False}
+        assert dummy.evaluate_all({}) == {}
+
+
+class TestCohort(TestCase):
+    definitions = {
+        'features': [{
+            'enabled': True,
+            'name': 'rollout',
+            'strategies': [
+                {'name': 'gradualRolloutUserId',
+                 'parameters': {'groupId': 'g', 'percentage': '30'}},
+                {'name': 'userWithId',
+                 'parameters': {'userIds': 'u1,u3,u5'}},
+            ],
+        }, {
+            'enabled': False,
+            'name': 'off',
+            'strategies': [{'parameters': {}, 'name': 'default'}],
+        }],
+    }
+
+    def setUp(self):
+        self.client = Client(
+            fetch=lambda: self.definitions, disable_metrics=True)
+
+    def test_matches_scalar_path(self):
+        keys = ['u%d' % i for i in range(5000)]
+
+        result = self.client.enabled_for('rollout', 'user_id', keys)
+
+        feature = self.client.get('rollout')
+        expected = [feature.decide({'user_id': k}) for k in keys]
+        assert result.tolist() == expected
+        assert result.format == '?'
+
+    def test_accepts_iterables(self):
+        result = self.client.enabled_for('rollout', 'user_id', iter(['u1']))
+        assert result.tolist() == [True]
+
+    def test_disabled_and_absent(self):
+        assert self.client.enabled_for('off', 'user_id', 'ab').tolist() == [
+            False, False]
+        assert self.client.enabled_for('absent', 'user_id', []).tolist() == []
+
+    def test_not_counted(self):
+        self.client.enabled_for('rollout', 'user_id', ['u1', 'u2'])
+        assert self.client.get('rollout').choices == {True: 0, False: 0}
+
+
+def rollout(name, percentage, enabled=True):
+    return {
+        'enabled': enabled,
+        'name': name,
+        'strategies': [{
+            'name': 'gradualRolloutUserId',
+            'parameters': {'groupId': name, 'percentage': percentage},
+        }],
+    }
+
+
+class TestSwap(TestCase):
+    def setUp(self):
+        self.defs = {'features': [rollout('a', '10'), rollout('b', '20')]}
+        self.client = Client(fetch=lambda: self.defs, disable_metrics=True)
+
+    def test_unchanged_features_are_reused(self):
+        before = dict(self.client.snapshot())
+        before['a']({'user_id': 'x'})
+
+        self.defs = {'features': [
+            rollout('a', '10'), rollout('b', '30'), rollout('c', '5'),
+        ]}
+        after = self.client.snapshot()
+
+        assert after['a'] is before['a']
+        assert after['b'] is not before['b']
+        assert after['b'].gates[0].percentage == 30
+        assert set(after) == {'a', 'b', 'c'}
+        assert after['a'].choices[False] + after['a'].choices[True] == 1
+
+    def test_changed_features_keep_counts(self):
+        self.client.enabled('b', {'user_id': 'x'})
+        self.client.enabled('b', {'user_id': 'y'})
+
+        self.defs = {'features': [rollout('a', '10'), rollout('b', '100')]}
+        self.client.enabled('b', {'user_id': 'z'})
+
+        choices = self.client.get('b').choices
+        assert choices[True] + choices[False] == 3
+        assert self.client.get('b').report()['yes'] >= 1
+
+    def test_member_sets_carry_over(self):
+        users = {'name': 'userWithId', 'parameters': {'userIds': 'u1,u2'}}
+        self.defs = {'features': [
+            {'name': 'a', 'enabled': True, 'strategies': [users]},
+            {'name': 'b', 'enabled': True, 'strategies': [dict(users)]},
+        ]}
+        before = self.client.snapshot()
+        assert before['a'].gates[0].members is before['b'].gates[0].members
+
+        self.defs = {'features': [
+            {'name': 'a', 'enabled': False, 'strategies': [users]},
+        ]}
+        after = self.client.snapshot()
+        assert after['a'] is not before['a']
+        assert after['a'].gates[0].members is before['a'].gates[0].members
+
+    def test_removed_features(self):
+        self.defs = {'features': [rollout('b', '20')]}
+        assert set(self.client.snapshot()) == {'b'}
+        assert not self.client.enabled('a', {'user_id': 'x'})
+
+
+class TestScoped(TestCase):
+    def setUp(self):
+        self.defs = {'features': [rollout('a', '50'), rollout('b', '100')]}
+        self.client = Client(fetch=lambda: self.defs, disable_metrics=True)
+
+    def test_memoizes_and_counts_every_check(self):
+        feature = self.client.get('b')
+        feature.decide = decide = mock.Mock(wraps=feature.decide)
+
+        with self.client.scoped({'user_id': 'x'}) as scope:
+            for _ in range(5):
+                assert scope.enabled('b')
+            assert not scope.enabled('absent')
+            assert not scope.enabled('absent')
+
+        assert decide.call_count == 1
+        assert self.client.get('b').choices == {True: 5, False: 0}
+
+    def test_pins_snapshot(self):
+        scope = self.client.scoped({'user_id': 'x'})
+        assert scope.enabled('b')
+
+        self.defs = {'features': [rollout('b', '0')]}
+        assert not self.client.enabled('b', {'user_id': 'x'})
+        assert scope.enabled('b')
+        assert scope.enabled('a') == (
+            scope.features['a'].decide({'user_id': 'x'}))
+
+    def test_dummy(self):
+        with DummyClient().scoped({}) as scope:
+            assert not scope.enabled('foo')
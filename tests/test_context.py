@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from unleash_client import Client, UnleashContext
+
+definitions = {'features': [{
+    'name': 'rollout-%d' % i,
+    'enabled': True,
+    'strategies': [{
+        'name': 'gradualRolloutUserId',
+        'parameters': {'groupId': 'g%d' % (i % 2), 'percentage': '50'},
+    }, {
+        'name': 'userWithId',
+        'parameters': {'userIds': '17'},
+    }],
+} for i in range(4)]}
+
+
+class TestUnleashContext(TestCase):
+    def setUp(self):
+        self.client = Client(fetch=lambda: definitions, disable_metrics=True)
+
+    def test_fields(self):
+        c = UnleashContext({'user_id': 17}, session_id=None, host='h')
+        assert c == {'user_id': '17', 'host': 'h'}
+        with self.assertRaises(TypeError):
+            UnleashContext({1: 'x'})
+        with self.assertRaises(TypeError):
+            c['user_id'] = 'other'
+
+    def test_same_answers_as_dict(self):
+        for i in range(50):
+            raw = {'user_id': 'u%d' % i}
+            context = UnleashContext(raw)
+            assert self.client.evaluate_all(context) == (
+                self.client.evaluate_all(raw))
+
+    def test_accepted_everywhere(self):
+        context = UnleashContext(user_id=17)
+        assert self.client.enabled('rollout-0', context)
+        assert self.client.enabled_many(['rollout-1'], context) == {
+            'rollout-1': True}
+        with self.client.scoped(context) as scope:
+            assert scope.enabled('rollout-2')
@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from unleash_client.definitions import (
+    FeatureDef, StrategyDef, decode, feature_def, load, merge, thaw,
+)
+from unleash_client.util import FrozenDict
+
+payload = (
+    b'{"version":1,"features":[{'
+    b'"name":"foo","description":"d","enabled":true,'
+    b'"strategies":[{"name":"userWithId","parameters":{"userIds":"a,b"}}]'
+    b'},{"name":"bar","enabled":false,"strategies":[]}]}'
+)
+
+
+class TestDecode(TestCase):
+    def test_decode(self):
+        d = decode(payload)
+
+        assert d['version'] == 1
+        foo, bar = d['features']
+        assert foo == FeatureDef('foo', True, (
+            StrategyDef('userWithId', {'userIds': 'a,b'}),
+        ))
+        assert foo['name'] == foo.name == 'foo'
+        assert foo.strategies[0]['parameters']['userIds'] == 'a,b'
+        assert type(foo.strategies[0].parameters) is FrozenDict
+        assert bar.strategies == ()
+        assert not hasattr(foo, '__dict__')
+
+    def test_immutable(self):
+        foo = decode(payload)['features'][0]
+        with self.assertRaises(AttributeError):
+            foo.enabled = False
+        with self.assertRaises(TypeError):
+            foo.strategies[0].parameters['userIds'] = 'c'
+
+    def test_mapping_access(self):
+        foo = decode(payload)['features'][0]
+        assert foo.get('description') is None
+        with self.assertRaises(KeyError):
+            foo['description']
+
+    def test_load_matches_decode(self):
+        as_dicts = thaw(decode(payload))
+        assert load(as_dicts) == decode(payload)
+        assert feature_def(as_dicts['features'][0]) == decode(
+            payload)['features'][0]
+
+    def test_equality(self):
+        a = FeatureDef('foo', True, ())
+        assert a == FeatureDef('foo', True, ())
+        assert a != FeatureDef('foo', False, ())
+        assert a != {'name': 'foo', 'enabled': True, 'strategies': ()}
+        assert a[0] == a['name'] == 'foo'
+
+    def test_merge(self):
+        d = merge(decode(payload), {
+            'features': [{'name': 'baz', 'enabled': True, 'strategies': []}],
+            'removed': ['bar'],
+        })
+        assert d['version'] == 1
+        assert [f.name for f in d['features']] == ['foo', 'baz']
+        assert merge(d, {})['features'] == d['features']
@@ -1,6 +1,7 @@
 from unittest import mock, TestCase
 
 from unleash_client import features
+from unleash_client.strategy import DEFAULT_STRATEGIES, always, never
 
 
 class TestFactory(TestCase):
@@ -83,3 +84,63 @@ class TestFeature(TestCase):
         assert not toggle({'z': True})
         assert not toggle({'z': False})
         assert toggle.choices == {True: 0, False: 2}
+
+
+class TestCompilePlan(TestCase):
+    def test_disabled_folds_to_constant(self):
+        feature_def = {
+            'enabled': False,
+            'strategies': [{'name': 'default', 'parameters': {}}],
+        }
+
+        toggle = features.Feature(DEFAULT_STRATEGIES, feature_def)
+
+        assert toggle.decide is never
+
+    def test_default_folds_to_constant(self):
+        feature_def = {
+            'enabled': True,
+            'strategies': [
+                {'name': 'userWithId', 'parameters': {'userIds': 'a,b'}},
+                {'name': 'default', 'parameters': {}},
+            ],
+        }
+
+        toggle = features.Feature(DEFAULT_STRATEGIES, feature_def)
+
+        assert toggle.decide is always
+        assert toggle({'user_id': 'c'})
+
+    def test_unknown_and_empty_rollouts_fold_away(self):
+        feature_def = {
+            'enabled': True,
+            'strategies': [
+                {'name': 'absent', 'parameters': {}},
+                {'name': 'gradualRolloutUserId',
+                 'parameters': {'groupId': 'g', 'percentage': '0'}},
+            ],
+        }
+
+        with mock.patch('unleash_client.features.log'):
+            toggle = features.Feature(DEFAULT_STRATEGIES, feature_def)
+
+        assert toggle.decide is never
+
+    def test_gates_read_context(self):
+        feature_def = {
+            'enabled': True,
+            'strategies': [
+                {'name': 'userWithId', 'parameters': {'userIds': 'a,b'}},
+                {'name': 'gradualRolloutUserId',
+                 'parameters': {'groupId': 'TEST', 'percentage': '25'}},
+            ],
+        }
+
+        toggle = features.Feature(DEFAULT_STRATEGIES, feature_def)
+        gates = features.feature_gates(DEFAULT_STRATEGIES, feature_def)
+
+        for i in range(100):
+            context = {'user_id': 'a%d' % i}
+            expected = any(g(**context) for g in gates)
+            assert toggle(context) == expected
+        assert toggle({'user_id': 'b'})
@@ -1,7 +1,12 @@
+import json
+import os
+import tempfile
 from requests import exceptions, Response
 from unittest import mock, TestCase
 
-from unleash_client import client, DummyClient, FileFetcher
+from unleash_client import client, Client, DummyClient, FileFetcher
+from unleash_client.definitions import FeatureDef
+from unleash_client.io import Scheduler
 
 example = {
     'features': [{
@@ -28,27 +33,21 @@ class TestDummyClient(TestCase):
 class TestUrlFetch(TestCase):
     url = 'http://example.com/api/features'
 
-    @mock.patch('unleash_client.io.requests')
-    def test_url_to_nowhere(self, requests):
-        requests.get.side_effect = exceptions.ConnectionError
+    @mock.patch('unleash_client.io.shared_session')
+    def test_url_to_nowhere(self, session):
+        session.return_value.get.side_effect = exceptions.ConnectionError
         assert not client(url=self.url).enabled('foo', {})
 
-    @mock.patch('unleash_client.io.requests')
-    def test_fetchable_url(self, requests):
-        requests.get.return_value = r = mock.Mock(wraps=Response())
+    @mock.patch('unleash_client.io.shared_session')
+    def test_fetchable_url(self, session):
+        session.return_value.get.return_value = r = mock.Mock(wraps=Response())
         r.ok = True
         r.status_code = 200
         r.headers = {'ETag': 'e-tag'}
-        r.json.return_value = {
-            'features': [{
-                'name': 'foo',
-                'enabled': True,
-                'strategies': [{'name': 'default', 'parameters': {}}],
-            }],
-        }
+        r.content = example_json.encode('utf-8')
         c = client(url=self.url)
         assert c.enabled('foo', {})
-        assert r.json.called
+        assert isinstance(c.get('foo').feature, FeatureDef)
 
 
 class TestFileFetch(TestCase):
@@ -107,3 +106,45 @@ class TestFileFetch(TestCase):
         assert not c.enabled('foo', {})
         assert s.called
         assert o.called
+
+
+class TestFileWatch(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.unlink, self.path)
+        os.close(fd)
+        self.write(example)
+        self.now = 0
+        self.scheduler = Scheduler(lambda: self.now, background=False)
+
+    def write(self, definitions, mtime=None):
+        with open(self.path, 'w') as fh:
+            json.dump(definitions, fh)
+        if mtime:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_evaluations_do_not_stat(self):
+        fetch = FileFetcher(self.path, interval=1, scheduler=self.scheduler)
+        fetch.stat_f = s = mock.Mock(wraps=os.stat)
+        c = Client(fetch=fetch, disable_metrics=True)
+
+        for _ in range(1000):
+            assert c.enabled('foo', {})
+
+        assert s.call_count == 1
+
+    def test_picks_up_edits(self):
+        fetch = FileFetcher(self.path, interval=1, scheduler=self.scheduler)
+        fetch.stat_f = s = mock.Mock(wraps=os.stat)
+        c = Client(fetch=fetch, disable_metrics=True)
+        assert c.enabled('foo', {})
+
+        self.write({'features': []}, mtime=os.stat(self.path).st_mtime + 5)
+        self.now = 0.5
+        self.scheduler.run_pending()
+        assert c.enabled('foo', {})
+
+        self.now = 1
+        self.scheduler.run_pending()
+        assert not c.enabled('foo', {})
+        assert s.call_count == 2
@@ -0,0 +1,73 @@
+import threading
+from unittest import TestCase
+
+from unleash_client import features
+from unleash_client.metrics import Tally
+from unleash_client.strategy import DEFAULT_STRATEGIES
+
+
+class TestTally(TestCase):
+    def test_counts(self):
+        t = Tally()
+        for result in [True, False, True, True]:
+            t(result)
+        assert t.pending() == {True: 3, False: 1}
+        assert t.totals() == (1, 3)
+
+    def test_flush_resets_pending(self):
+        t = Tally()
+        t(True)
+        assert t.flush() == {True: 1, False: 0}
+        assert t.flush() == {True: 0, False: 0}
+        t(False)
+        assert t.flush() == {True: 0, False: 1}
+        assert t.totals() == (1, 1)
+
+    def test_reads_do_not_count(self):
+        t = Tally()
+        for _ in range(5):
+            assert t.totals() == (0, 0)
+            assert t.pending() == {True: 0, False: 0}
+        t(True)
+        assert t.totals() == (0, 1)
+        assert t.flush() == {True: 1, False: 0}
+        assert t.totals() == (0, 1)
+
+
+class TestConcurrency(TestCase):
+    threads = 8
+    rounds = 20000
+
+    def test_exact_totals_under_concurrent_reports(self):
+        toggle = features.Feature(DEFAULT_STRATEGIES, {
+            'enabled': True,
+            'strategies': [
+                {'name': 'userWithId', 'parameters': {'userIds': 'even'}},
+            ],
+        })
+        reports = []
+        done = threading.Event()
+
+        def evaluate():
+            for i in range(self.rounds):
+                toggle({'user_id': 'even' if i % 2 else 'odd'})
+
+        def report():
+            while not done.is_set():
+                reports.append(toggle.report())
+
+        workers = [threading.Thread(target=evaluate)
+                   for _ in range(self.threads)]
+        reporter = threading.Thread(target=report)
+        reporter.start()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        done.set()
+        reporter.join()
+        reports.append(toggle.report())
+
+        half = self.threads * self.rounds // 2
+        assert sum(r['yes'] for r in reports) == half
+        assert sum(r['no'] for r in reports) == half
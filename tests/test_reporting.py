@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from unleash_client import Client
+from unleash_client.io import Reporter, Scheduler
+
+from .helpers import toggle
+from .server import StandIn
+
+
+definitions = {'features': [toggle('foo'), toggle('bar'), toggle('idle')]}
+
+
+class TestReporting(TestCase):
+    def setUp(self):
+        self.server = StandIn().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.now = 1000
+        self.client = Client(fetch=lambda: definitions, disable_metrics=True)
+        self.reporter = self.make_reporter()
+
+    def make_reporter(self, **kw):
+        self.scheduler = Scheduler(lambda: self.now, background=False)
+        return Reporter(
+            self.client, self.server.url + '/api/client/metrics', 10,
+            clock=lambda: self.now, scheduler=self.scheduler, **kw)
+
+    def evaluate(self, **evaluations):
+        for name, n in evaluations.items():
+            for _ in range(n):
+                self.client.enabled(name, {})
+
+    def tick(self, seconds=10, **evaluations):
+        self.evaluate(**evaluations)
+        self.now += seconds
+        self.reporter.lock.acquire()
+        self.reporter.run()
+
+    def advance(self, seconds):
+        self.now += seconds
+        self.scheduler.run_pending()
+
+    def posts(self):
+        return self.server.count('POST', '/api/client/metrics')
+
+    def test_only_evaluated_features(self):
+        self.tick(foo=2)
+        self.tick()
+
+        assert self.posts() == 1
+        [report] = self.server.metrics
+        assert report['bucket']['toggles'] == {'foo': {'yes': 2, 'no': 0}}
+
+    def test_failed_buckets_are_merged_after_backoff(self):
+        self.reporter.start()
+        self.server.failures = 2
+        self.evaluate(foo=3)
+        self.advance(10)
+        assert self.posts() == 1
+        self.evaluate(foo=2, bar=1)
+        self.advance(10)
+        assert self.posts() == 1
+        self.advance(10)
+        assert self.posts() == 2
+        self.evaluate(bar=1)
+        self.advance(30)
+        assert self.posts() == 2
+        self.advance(10)
+        assert self.posts() == 3
+
+        [report] = self.server.metrics
+        assert report['bucket']['toggles'] == {
+            'foo': {'yes': 5, 'no': 0},
+            'bar': {'yes': 2, 'no': 0},
+        }
+        assert report['bucket']['start'] == self.reporter.fmt_time(1000)
+        assert report['bucket']['stop'] == self.reporter.fmt_time(1070)
+        assert not self.reporter.buffer
+        assert self.reporter.failures == 0
+
+    def test_buffer_is_bounded(self):
+        self.reporter = self.make_reporter(buffered=2)
+        self.server.failures = 100
+        for _ in range(5):
+            self.tick(seconds=1000, foo=1)
+
+        assert len(self.reporter.buffer) == 2
+        self.server.failures = 0
+        self.reporter()
+        [report] = self.server.metrics
+        assert report['bucket']['toggles'] == {'foo': {'yes': 2, 'no': 0}}
+
+    def test_unreachable_server(self):
+        self.server.__exit__(None, None, None)
+        self.tick(foo=1)
+        assert len(self.reporter.buffer) == 1
+        assert self.reporter.failures == 1
+        assert self.reporter.next_delay() == 20
@@ -0,0 +1,108 @@
+import threading
+from unittest import mock, TestCase
+
+from unleash_client import Client
+from unleash_client.io import PeriodicalOperation, Reporter, Scheduler
+
+from .helpers import Clock
+
+definitions = {'features': [{
+    'name': 'foo',
+    'enabled': True,
+    'strategies': [{'name': 'default', 'parameters': {}}],
+}]}
+
+
+class Counting(PeriodicalOperation):
+    def __init__(self, interval, clock, scheduler):
+        super().__init__(interval, clock, scheduler)
+        self.steps = 0
+        self.ran = threading.Event()
+
+    def step(self):
+        self.steps += 1
+        self.cache = self.steps
+        self.ran.set()
+        return self.cache
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.scheduler = Scheduler(self.clock, background=False)
+
+    def test_runs_when_due(self):
+        op = Counting(10, self.clock, self.scheduler)
+        op.start()
+
+        self.scheduler.run_pending()
+        assert op.steps == 0
+
+        for now in (9.9, 10, 15, 20, 30):
+            self.clock.now = now
+            self.scheduler.run_pending()
+
+        assert op.steps == 3
+
+    def test_interleaves_operations(self):
+        fast = Counting(1, self.clock, self.scheduler)
+        slow = Counting(5, self.clock, self.scheduler)
+        fast.start()
+        slow.start()
+
+        for now in range(1, 11):
+            self.clock.now = now
+            self.scheduler.run_pending()
+
+        assert (fast.steps, slow.steps) == (10, 2)
+
+    def test_remove(self):
+        op = Counting(1, self.clock, self.scheduler)
+        op.start()
+        op.stop()
+
+        self.clock.now = 5
+        self.scheduler.run_pending()
+
+        assert op.steps == 0
+        assert not self.scheduler.queue
+
+    def test_hot_path_reads_no_clock(self):
+        clock = mock.Mock(return_value=0)
+        op = Counting(1, clock, self.scheduler)
+
+        assert op() == 1
+        reads = clock.call_count
+        for _ in range(100):
+            assert op() == 1
+
+        assert clock.call_count == reads
+        assert op in self.scheduler.ops
+
+    def test_background_thread_stops_when_empty(self):
+        scheduler = Scheduler()
+        op = Counting(0.01, Clock(), scheduler)
+        op.start(0)
+
+        assert op.ran.wait(5)
+        thread = scheduler.thread
+        op.stop()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert scheduler.thread is None
+
+
+class TestClientClose(TestCase):
+    def test_close_stops_and_flushes(self):
+        scheduler = Scheduler(Clock(), background=False)
+        c = Client(fetch=lambda: definitions, scheduler=scheduler)
+        assert isinstance(c.reporter, Reporter)
+        assert c.reporter in scheduler.ops
+        assert c.enabled('foo', {})
+
+        with mock.patch('unleash_client.io.shared_session') as session:
+            c.close()
+
+        assert not scheduler.ops
+        assert session.return_value.post.called
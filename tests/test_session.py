@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+from unittest import TestCase
+
+from unleash_client import Client, http_session
+from unleash_client.io import Scheduler, shared_session
+
+from .server import StandIn
+
+served = {
+    'version': 1,
+    'features': [{
+        'name': 'foo',
+        'enabled': True,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    }],
+}
+
+
+def poll_in_child(url):
+    shared_session().get(url, timeout=5)
+    os._exit(0)
+
+
+class TestSession(TestCase):
+    def setUp(self):
+        self.server = StandIn(served).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.scheduler = Scheduler(background=False)
+
+    def client(self, **kw):
+        c = Client(self.server.url, scheduler=self.scheduler, **kw)
+        self.addCleanup(c.close)
+        return c
+
+    def test_keep_alive_across_fetch_and_report(self):
+        c = self.client(session=http_session(pool_size=2))
+
+        for _ in range(3):
+            assert c.enabled('foo', {})
+            c.fetch.lock.acquire()
+            c.fetch.run()
+            c.reporter()
+
+        assert self.server.count('GET', '/api/features') == 4
+        assert self.server.count('POST', '/api/client/metrics') == 3
+        assert self.server.connections == 1
+
+    def test_gzip_both_ways(self):
+        c = self.client()
+        assert c.enabled('foo', {})
+        c.reporter()
+
+        _, _, get_headers = self.server.requests[0]
+        _, _, post_headers = self.server.requests[1]
+        assert 'gzip' in get_headers['Accept-Encoding']
+        assert post_headers['Content-Encoding'] == 'gzip'
+        toggles = self.server.metrics[0]['bucket']['toggles']
+        assert toggles['foo'] == {'yes': 1, 'no': 0}
+
+    def test_shared_by_default(self):
+        c = self.client()
+        assert c.fetch.session is None
+        assert shared_session() is shared_session()
+
+    def test_fresh_connection_after_fork(self):
+        url = self.server.url + '/api/features'
+        assert shared_session().get(url, timeout=5).ok
+        ctx = multiprocessing.get_context('fork')
+
+        child = ctx.Process(target=poll_in_child, args=(url,))
+        child.start()
+        child.join(10)
+        assert shared_session().get(url, timeout=5).ok
+
+        assert child.exitcode == 0
+        assert self.server.count('GET', '/api/features') == 3
+        assert self.server.connections == 2
+
+    def test_pool_size(self):
+        session = http_session(pool_size=7)
+        adapter = session.get_adapter('https://example.com')
+        assert adapter._pool_maxsize == 7
+        assert adapter._pool_connections == 7
+
+    def test_timeout(self):
+        self.server.delay = 0.5
+        c = self.client(timeout=0.05)
+        assert not c.enabled('foo', {})
@@ -0,0 +1,281 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from unleash_client import Client, features
+from unleash_client.io import Scheduler, UrlFetcher
+from unleash_client.shared import (
+    HEADER, MAGIC, HostMetrics, MmapFetcher, SnapshotPublisher,
+    SnapshotReader, SnapshotWriter,
+)
+from unleash_client.strategy import DEFAULT_STRATEGIES
+from unleash_client.util import FrozenDict
+
+from .server import StandIn
+
+
+def definitions(*names):
+    return FrozenDict(version=1, features=[
+        FrozenDict(name=name, enabled=True, strategies=[
+            FrozenDict(name='default', parameters=FrozenDict()),
+        ])
+        for name in names
+    ])
+
+
+def read_in_child(path, queue):
+    reader = SnapshotReader(path)
+    queue.put([f['name'] for f in reader.read()['features']])
+
+
+def publish_in_child(path, queue):
+    writer = SnapshotWriter(path)
+    queue.put(writer.publish(definitions('bar')))
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'snapshot')
+        self.writer = SnapshotWriter(self.path)
+        self.addCleanup(self.writer.close)
+
+    def test_round_trip(self):
+        reader = SnapshotReader(self.path)
+        self.addCleanup(reader.close)
+
+        assert reader.read() is None
+        seq = self.writer.publish(definitions('foo'))
+
+        result = reader.read()
+        assert result['features'][0]['name'] == 'foo'
+        assert reader.seq == seq
+        assert reader.read() is None
+
+    def test_new_versions_and_growth(self):
+        reader = SnapshotReader(self.path)
+        self.addCleanup(reader.close)
+        self.writer.publish(definitions('foo'))
+        assert reader.read()
+
+        names = ['feature-%d' % i for i in range(2000)]
+        self.writer.publish(definitions(*names))
+
+        result = reader.read()
+        assert len(result['features']) == 2000
+        assert len(reader.map) > 4096
+
+    def test_torn_write_is_skipped(self):
+        reader = SnapshotReader(self.path)
+        self.addCleanup(reader.close)
+        seq = self.writer.publish(definitions('foo'))
+        HEADER.pack_into(self.writer.map, 0, MAGIC, seq + 1, 0)
+
+        assert reader.read() is None
+
+    def test_single_writer(self):
+        self.writer.publish(definitions('foo'))
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+
+        child = ctx.Process(target=publish_in_child, args=(self.path, queue))
+        child.start()
+        child.join(10)
+
+        assert queue.get(timeout=1) is None
+        reader = SnapshotReader(self.path)
+        self.addCleanup(reader.close)
+        assert reader.read()['features'][0]['name'] == 'foo'
+
+    def test_forked_reader(self):
+        self.writer.publish(definitions('foo', 'bar'))
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+
+        child = ctx.Process(target=read_in_child, args=(self.path, queue))
+        child.start()
+        child.join(10)
+
+        assert queue.get(timeout=1) == ['foo', 'bar']
+
+
+class TestClients(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'snapshot')
+        self.scheduler = Scheduler(background=False)
+
+    def test_publisher_to_worker(self):
+        source = [definitions('foo')]
+        publisher = SnapshotPublisher(
+            lambda: source[0], self.path, scheduler=self.scheduler)
+        publisher.start(0)
+        self.scheduler.run_pending()
+
+        fetch = MmapFetcher(self.path, scheduler=self.scheduler)
+        c = Client(fetch=fetch, disable_metrics=True)
+        assert c.enabled('foo', {})
+        assert c.wait_ready(0)
+
+        source[0] = definitions('bar')
+        publisher.lock.acquire()
+        publisher.run()
+        fetch.lock.acquire()
+        fetch.run()
+
+        assert not c.enabled('foo', {})
+        assert c.enabled('bar', {})
+
+    def test_forked_workers_do_not_poll(self):
+        with StandIn(definitions('foo')) as server:
+            fetch = UrlFetcher(server.url + '/api/features', 0.05)
+            publisher = SnapshotPublisher(fetch, self.path, interval=0.05)
+            publisher.start(0)
+            assert publisher.ready.wait(5)
+
+            ctx = multiprocessing.get_context('fork')
+            children = [
+                ctx.Process(target=time.sleep, args=(0.5,))
+                for _ in range(3)
+            ]
+            for child in children:
+                child.start()
+            publisher.stop()
+            fetch.stop()
+            polled = server.count('GET', '/api/features')
+            for child in children:
+                child.join(10)
+
+            assert server.count('GET', '/api/features') - polled <= 1
+
+    def test_worker_before_publisher(self):
+        fetch = MmapFetcher(self.path, scheduler=self.scheduler)
+        c = Client(fetch=fetch, disable_metrics=True)
+
+        assert not c.enabled('foo', {})
+        assert not c.wait_ready(0)
+
+
+served = definitions('foo')
+
+
+def counted():
+    return features.Feature(DEFAULT_STRATEGIES, {
+        'enabled': True,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    })
+
+
+def counting_worker(path, rounds, url=None):
+    if url is None:
+        metrics = HostMetrics(path)
+        toggle = counted()
+        for _ in range(rounds):
+            toggle({})
+        metrics.sync({'foo': toggle})
+    else:
+        c = Client(url, fetch=lambda: served,
+                   scheduler=Scheduler(background=False),
+                   metrics_path=path)
+        for _ in range(rounds):
+            c.enabled('foo', {})
+        c.reporter.lock.acquire()
+        c.reporter.run()
+    os._exit(0)
+
+
+class TestHostMetrics(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'metrics')
+        self.ctx = multiprocessing.get_context('fork')
+
+    def workers(self, n, rounds, url=None):
+        procs = [
+            self.ctx.Process(
+                target=counting_worker, args=(self.path, rounds, url))
+            for _ in range(n)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(10)
+            assert p.exitcode == 0
+
+    def test_dead_workers_are_harvested(self):
+        self.workers(3, 100)
+        metrics = HostMetrics(self.path)
+        self.addCleanup(metrics.close)
+
+        assert metrics.elect()
+        toggles, seen, dead = metrics.harvest()
+        assert toggles == {'foo': {'yes': 300, 'no': 0}}
+        assert len(dead) == 3
+
+        metrics.commit(seen, dead)
+        assert metrics.harvest() == ({}, [], [])
+        assert metrics.claim() is not None
+
+    def test_failed_post_keeps_counts(self):
+        self.workers(2, 10)
+        metrics = HostMetrics(self.path)
+        self.addCleanup(metrics.close)
+        metrics.elect()
+
+        toggles, seen, dead = metrics.harvest()
+        metrics.release(dead)
+
+        assert metrics.harvest()[0] == toggles == {
+            'foo': {'yes': 20, 'no': 0}}
+
+    def test_sync_between_harvest_and_commit(self):
+        worker, reporter = HostMetrics(self.path), HostMetrics(self.path)
+        self.addCleanup(worker.close)
+        self.addCleanup(reporter.close)
+        toggle = counted()
+        for _ in range(5):
+            toggle({})
+        worker.sync({'foo': toggle})
+
+        assert reporter.elect()
+        toggles, seen, dead = reporter.harvest()
+        assert toggles == {'foo': {'yes': 5, 'no': 0}}
+        for _ in range(7):
+            toggle({})
+        worker.sync({'foo': toggle})
+        reporter.commit(seen, dead)
+
+        assert reporter.harvest()[0] == {'foo': {'yes': 7, 'no': 0}}
+
+    def test_full_slot_keeps_tally(self):
+        metrics = HostMetrics(self.path, capacity=1)
+        self.addCleanup(metrics.close)
+        foo, bar = counted(), counted()
+        foo({})
+        bar({})
+        bar({})
+
+        with self.assertLogs('unleash_client.shared', 'WARNING'):
+            metrics.sync({'foo': foo, 'bar': bar})
+
+        assert foo.tally.pending() == {False: 0, True: 0}
+        assert bar.tally.pending() == {False: 0, True: 2}
+
+    def test_one_post_per_host(self):
+        with StandIn() as server:
+            self.workers(4, 25, server.url)
+            c = Client(server.url, fetch=lambda: served,
+                       scheduler=Scheduler(background=False),
+                       metrics_path=self.path)
+            c.enabled('foo', {})
+            c.close()
+
+            assert server.count('POST', '/api/client/metrics') == 1
+            toggles = server.metrics[0]['bucket']['toggles']
+            assert toggles == {'foo': {'yes': 101, 'no': 0}}
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from unleash_client import Client, DummyClient
+from unleash_client.io import Scheduler
+from unleash_client.metrics import Histogram, Stats
+
+from .server import StandIn
+
+served = {
+    'version': 1,
+    'features': [{
+        'name': 'foo',
+        'enabled': True,
+        'strategies': [{'name': 'default', 'parameters': {}}],
+    }],
+}
+
+
+class TestHistogram(TestCase):
+    def test_cumulative_buckets(self):
+        h = Histogram()
+        for seconds in [0.0000005, 0.000003, 0.002, 30]:
+            h.observe(seconds)
+
+        summary = h.summary()
+        assert summary['count'] == 4
+        assert summary['buckets']['1e-06'] == 1
+        assert summary['buckets']['5e-06'] == 2
+        assert summary['buckets']['0.0025'] == 3
+        assert summary['buckets']['5'] == 3
+        assert summary['buckets']['+Inf'] == 4
+
+
+class TestStats(TestCase):
+    def setUp(self):
+        self.now = 100
+        self.events = []
+        self.stats = Stats(
+            hooks=[lambda *event: self.events.append(event)],
+            clock=lambda: self.now,
+        )
+
+    def test_hooks_see_every_event(self):
+        self.stats.count('fetches')
+        self.stats.observe('fetch_seconds', 0.5)
+        assert self.events == [('fetches', 1), ('fetch_seconds', 0.5)]
+
+    def test_snapshot_age(self):
+        assert self.stats()['snapshot_age'] is None
+        self.stats.swapped(0.01)
+        self.now = 103
+        assert self.stats()['snapshot_age'] == 3
+        assert self.stats()['counters']['swaps'] == 1
+
+
+class TestInstrumentedClient(TestCase):
+    def setUp(self):
+        self.server = StandIn(served).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.client = Client(
+            self.server.url,
+            disable_metrics=True,
+            instrument=True,
+            scheduler=Scheduler(background=False),
+        )
+
+    def test_fetch_counters(self):
+        assert self.client.enabled('foo', {})
+        self.client.fetch.step()
+        self.server.publish({'version': 1, 'features': []})
+        self.client.fetch.step()
+        assert not self.client.enabled('foo', {})
+
+        stats = self.client.stats()
+        counters = stats['counters']
+        assert counters['fetches'] == 3
+        assert counters['not_modified'] == 1
+        assert counters['errors'] == 0
+        assert counters['swaps'] == 2
+        assert counters['payload_bytes'] > 0
+        assert stats['latencies']['fetch_seconds']['count'] == 3
+        assert stats['latencies']['parse_seconds']['count'] == 2
+        assert stats['latencies']['compile_seconds']['count'] == 2
+        assert stats['latencies']['evaluate_seconds']['count'] == 2
+        assert stats['snapshot_age'] >= 0
+
+    def test_errors(self):
+        self.server.__exit__(None, None, None)
+        self.client.enabled('foo', {})
+        assert self.client.stats()['counters']['errors'] == 1
+
+    def test_disabled(self):
+        c = Client(fetch=lambda: served, disable_metrics=True)
+        assert c.stats() == {}
+        assert 'enabled' not in vars(c)
+        assert DummyClient().stats() == {}
@@ -1,8 +1,12 @@
+import gc
 import random
 
 from unittest import TestCase
 
-from unleash_client.strategy import DEFAULT_STRATEGIES, normalize
+from unleash_client import strategy
+from unleash_client.strategy import (
+    DEFAULT_STRATEGIES, always, never, normalize, normalize_many,
+)
 
 
 class TestDefault(TestCase):
@@ -16,6 +20,11 @@ class TestNormalize(TestCase):
         v = [normalize('a%d' % i, 'group') for i in range(10)]
         assert v == [59, 67, 9, 27, 69, 82, 53, 39, 76, 18]
 
+    def test_normalize_many(self):
+        keys = ['a%d' % i for i in range(10)] + [17, 'ö', '']
+        v = list(normalize_many(keys, 'group'))
+        assert v == [normalize(k, 'group') for k in keys]
+
 
 class TestGradual(TestCase):
     t = DEFAULT_STRATEGIES['gradualRolloutUserId']('TEST', 25)
@@ -42,6 +51,30 @@ class TestGradual(TestCase):
 
         assert v == [7486, 2514]
 
+    def test_cohort(self):
+        keys = ['c%d' % i for i in range(10000)]
+        v = self.t.cohort('user_id', keys)
+        assert list(v) == [int(self.t(user_id=k)) for k in keys]
+
+    def test_cohort_other_field(self):
+        v = self.t.cohort('session_id', ['a', 'b'])
+        assert list(v) == [int(self.t(session_id='a'))] * 2
+
+    def test_contextual(self):
+        for i in range(100):
+            context = {'user_id': 'd%d' % i}
+            assert self.t.contextual(context) == self.t(**context)
+
+    def test_constant_percentages(self):
+        rollout = DEFAULT_STRATEGIES['gradualRolloutUserId']
+        assert rollout('g', '100').contextual is always
+        assert rollout('g', '0').contextual is never
+
+    def test_slots(self):
+        assert not hasattr(self.t, '__dict__')
+        assert (self.t.key, self.t.group_id, self.t.percentage) == (
+            'user_id', 'TEST', 25)
+
 
 class TestGradualRandom(TestCase):
     r = random.Random(x=1234)
@@ -86,3 +119,83 @@ class TestExplicitSet(TestCase):
 
     def test_absent(self):
         assert not self.t(cthulhu_for_president='why vote for a lesser evil?')
+
+    def test_contextual(self):
+        assert self.t.contextual({'user_id': 'baker'})
+        assert not self.t.contextual({'user_id': 'easy'})
+        assert not hasattr(self.t, '__dict__')
+
+
+class TestNormalizeCache(TestCase):
+    def tearDown(self):
+        strategy.cache_normalize(0)
+
+    def test_cached_results_match(self):
+        strategy.cache_normalize(4)
+        t = DEFAULT_STRATEGIES['gradualRolloutUserId']('TEST', 25)
+
+        v = [int(t(user_id='a%d' % (i % 6))) for i in range(12)]
+
+        assert v == [int(strategy.bucket('a%d' % (i % 6), 'TEST') < 25)
+                     for i in range(12)]
+
+    def test_counters(self):
+        strategy.cache_normalize(2)
+
+        for key in ['a', 'a', 'b', 'a', 'c', 'b']:
+            strategy.normalize(key, 'g')
+
+        info = strategy.normalize_cache_info()
+        assert (info.hits, info.misses, info.maxsize) == (2, 4, 2)
+        assert info.currsize == 2
+
+    def test_uncached(self):
+        strategy.cache_normalize(0)
+        assert strategy.normalize is strategy.bucket
+        assert strategy.normalize_cache_info() is None
+
+    def test_client_configures_cache(self):
+        from unleash_client import Client
+        c = Client(fetch=dict, disable_metrics=True, normalize_cache_size=8)
+        assert c.normalize_cache_info().maxsize == 8
+
+
+class TestMemberSets(TestCase):
+    def test_shared_between_strategies(self):
+        make = DEFAULT_STRATEGIES['userWithId']
+        a, b = make(userIds=''.join(['x,', 'y,z'])), make(userIds='x,y,z')
+        assert a.members is b.members
+        assert a.members == {'x', 'y', 'z'}
+        assert make(userIds='x,y').members is not a.members
+
+    def test_released_when_unused(self):
+        make = DEFAULT_STRATEGIES['applicationHostname']
+        make(hostNames='released,h1')
+        gc.collect()
+        assert 'released,h1' not in strategy._member_sets
+
+
+class TestRemoteAddress(TestCase):
+    t = DEFAULT_STRATEGIES['remoteAddress'](
+        IPs='10.0.0.1,192.168.0.0/16,2001:db8::/32,not-an-ip,bad/range')
+
+    def test_exact(self):
+        assert self.t(remote_addr='10.0.0.1')
+        assert self.t(remote_addr='not-an-ip')
+        assert not self.t(remote_addr='10.0.0.2')
+
+    def test_ranges(self):
+        assert self.t.contextual({'remote_addr': '192.168.44.5'})
+        assert self.t.contextual({'remote_addr': '2001:db8:1::7'})
+        assert not self.t.contextual({'remote_addr': '192.169.0.1'})
+        assert not self.t.contextual({'remote_addr': '2001:db9::1'})
+        assert not self.t.contextual({})
+
+    def test_cohort(self):
+        keys = ['192.168.0.1', '10.0.0.1', '8.8.8.8', '']
+        v = self.t.cohort('remote_addr', keys)
+        assert list(v) == [1, 1, 0, 0]
+
+    def test_plain_lists_stay_sets(self):
+        t = DEFAULT_STRATEGIES['remoteAddress'](IPs='10.0.0.1,10.0.0.2')
+        assert type(t) is strategy.ExplicitSet
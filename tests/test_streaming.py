@@ -0,0 +1,155 @@
+import json
+import multiprocessing
+import threading
+import time
+from unittest import mock, TestCase
+
+from unleash_client import Client, client
+from unleash_client.io import Scheduler, StreamingFetcher
+
+from .helpers import toggle
+from .server import StandIn
+
+
+served = {'version': 1, 'features': [toggle('foo'), toggle('bar', False)]}
+
+
+def eventually(check, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def follow_in_child(c, queue):
+    queue.put(c.fetch.connected.wait(5))
+    queue.put(eventually(lambda: not c.enabled('foo', {})))
+
+
+class TestStreaming(TestCase):
+    def setUp(self):
+        self.server = StandIn(served).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.server.streaming = True
+        self.scheduler = Scheduler(background=False)
+        self.client = Client(
+            self.server.url,
+            disable_metrics=True,
+            streaming=True,
+            scheduler=self.scheduler,
+        )
+        self.client.fetch.retry = 0.05
+        self.addCleanup(self.client.close)
+
+    def polls(self):
+        return self.server.count('GET', '/api/features')
+
+    def test_pushed_snapshots_apply_without_polling(self):
+        assert self.client.enabled('foo', {})
+        assert self.client.fetch.connected.wait(5)
+
+        self.server.publish({'version': 1, 'features': [toggle('foo', False)]})
+
+        assert eventually(lambda: not self.client.enabled('foo', {}))
+        self.client.fetch.lock.acquire()
+        self.client.fetch.run()
+        assert self.polls() == 1
+
+    def test_deltas(self):
+        assert not self.client.enabled('bar', {})
+        assert self.client.fetch.connected.wait(5)
+
+        self.server.push('delta', {
+            'features': [toggle('bar'), toggle('baz')],
+            'removed': ['foo'],
+        })
+
+        assert eventually(lambda: self.client.enabled('baz', {}))
+        assert self.client.enabled('bar', {})
+        assert not self.client.enabled('foo', {})
+
+    def test_falls_back_to_polling_and_reconnects(self):
+        assert self.client.enabled('foo', {})
+        assert self.client.fetch.connected.wait(5)
+
+        self.server.streaming = False
+        self.server.disconnect()
+        assert eventually(lambda: not self.client.fetch.connected.is_set())
+
+        self.server.features = {'version': 1, 'features': []}
+        self.server.etag = '"2"'
+        self.client.fetch.lock.acquire()
+        self.client.fetch.run()
+        assert self.polls() == 2
+        assert not self.client.enabled('foo', {})
+
+        self.server.streaming = True
+        assert self.client.fetch.connected.wait(5)
+
+    def test_close_stops_listening(self):
+        assert self.client.enabled('foo', {})
+        thread = self.client.fetch.thread
+        assert self.client.fetch.connected.wait(5)
+
+        self.client.close()
+        thread.join(5)
+        assert not thread.is_alive()
+
+    def test_forked_child_reconnects(self):
+        c = Client(self.server.url, disable_metrics=True, streaming=True,
+                   refresh_interval=0.2)
+        self.addCleanup(c.close)
+        assert c.enabled('foo', {})
+        assert c.fetch.connected.wait(5)
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+
+        child = ctx.Process(target=follow_in_child, args=(c, queue))
+        child.start()
+        assert queue.get(timeout=10)
+        self.server.publish({'version': 1, 'features': [toggle('foo', False)]})
+        changed = queue.get(timeout=10)
+        child.join(10)
+
+        assert changed
+        assert self.server.count('GET', '/api/client/streaming') == 2
+
+    def test_factory(self):
+        c = client(url=self.server.url, streaming=True, disable_metrics=True)
+        self.addCleanup(c.close)
+        assert isinstance(c.fetch, StreamingFetcher)
+        assert c.enabled('foo', {})
+
+
+class TestOrdering(TestCase):
+    def test_stream_update_during_poll_wins(self):
+        polling, release = threading.Event(), threading.Event()
+
+        def get(**kw):
+            polling.set()
+            release.wait(5)
+            return mock.Mock(
+                status_code=200, ok=True, headers={'ETag': '"1"'},
+                content=json.dumps(served).encode('utf-8'))
+
+        fetch = StreamingFetcher(
+            'http://unleash/api/features', 60, 'http://unleash/stream',
+            scheduler=Scheduler(background=False),
+            session=mock.Mock(get=mock.Mock(side_effect=get)))
+        fetch.lock.acquire()
+        poll = threading.Thread(target=fetch.run)
+        poll.start()
+        assert polling.wait(5)
+
+        pushed = {'version': 1, 'features': [toggle('baz')]}
+        push = threading.Thread(
+            target=fetch.dispatch, args=('features', json.dumps(pushed)))
+        push.start()
+        time.sleep(0.05)
+        release.set()
+        poll.join(5)
+        push.join(5)
+
+        assert [f.name for f in fetch.cache['features']] == ['baz']
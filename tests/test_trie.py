@@ -0,0 +1,50 @@
+import ipaddress
+import random
+from unittest import TestCase
+
+from unleash_client.trie import PrefixTrie
+
+
+def random_network(r, version):
+    bits = 32 if version == 4 else 128
+    network = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+    shift = bits - r.randint(1, bits)
+    return network((r.getrandbits(bits) >> shift << shift, bits - shift))
+
+
+class TestPrefixTrie(TestCase):
+    def check(self, version, networks, probes):
+        trie = PrefixTrie(networks)
+        for address in probes:
+            expected = any(address in n for n in networks)
+            assert (address.packed in trie) == expected, address
+
+    def test_matches_linear_scan_v4(self):
+        r = random.Random(4)
+        networks = [random_network(r, 4) for _ in range(200)]
+        probes = [ipaddress.IPv4Address(r.getrandbits(32))
+                  for _ in range(2000)]
+        probes += [n.network_address for n in networks]
+        probes += [n.broadcast_address for n in networks]
+        self.check(4, networks, probes)
+
+    def test_matches_linear_scan_v6(self):
+        r = random.Random(6)
+        networks = [random_network(r, 6) for _ in range(200)]
+        probes = [ipaddress.IPv6Address(r.getrandbits(128))
+                  for _ in range(2000)]
+        probes += [n.network_address for n in networks]
+        self.check(6, networks, probes)
+
+    def test_shorter_prefix_covers_longer(self):
+        trie = PrefixTrie([
+            ipaddress.ip_network('10.1.2.0/24'),
+            ipaddress.ip_network('10.0.0.0/8'),
+        ])
+        assert ipaddress.ip_address('10.200.0.1').packed in trie
+        assert ipaddress.ip_address('11.0.0.1').packed not in trie
+
+    def test_everything(self):
+        assert b'\x01\x02\x03\x04' in PrefixTrie(
+            [ipaddress.ip_network('0.0.0.0/0')])
+        assert not PrefixTrie()
@@ -1,7 +1,9 @@
 import logging
 
+from .aio import AsyncClient
 from .clients import Client, DummyClient
-from .io import UrlFetcher, FileFetcher
+from .context import UnleashContext
+from .io import UrlFetcher, StreamingFetcher, FileFetcher, http_session
 
 log = logging.getLogger(__name__)
 
@@ -11,6 +13,7 @@ def client(
     refresh_interval=60,
     fetch=None,
     *al,
+    cache_dir=None,
     **kw
 ):
     if fetch:
@@ -22,7 +25,22 @@ def client(
     elif url.startswith('file:///'):
         fetch = FileFetcher(url[8:])
     elif url.startswith('http://') or url.startswith('https://'):
-        fetch = UrlFetcher(url + '/api/features', refresh_interval)
+        options = dict(
+            cache_dir=cache_dir,
+            session=kw.get('session'),
+            timeout=kw.get('timeout', 3.0),
+            jitter=kw.get('jitter', 0.1),
+        )
+        if kw.get('streaming'):
+            fetch = StreamingFetcher(
+                url + '/api/features',
+                refresh_interval,
+                url + '/api/client/streaming',
+                **options
+            )
+        else:
+            fetch = UrlFetcher(
+                url + '/api/features', refresh_interval, **options)
     else:
         log.error("Unexpected unleash client url scheme: %r", url)
         raise ValueError(url)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+from .clients import Client
+from .io import PeriodicalOperation, Reporter, StreamingFetcher
+
+log = logging.getLogger(__name__)
+
+
+class AsyncClient(Client):
+    def __init__(self, *al, **kw):
+        self.delays = {}
+        self.tasks = {}
+        self.started = False
+        super().__init__(*al, scheduler=self, **kw)
+        self.fetcher = self.fetch
+        if isinstance(self.fetcher, PeriodicalOperation):
+            self.fetch = self.cached
+
+    def cached(self):
+        cache = self.fetcher.cache
+        return {} if cache is PeriodicalOperation else cache
+
+    def add(self, op, delay=None):
+        self.delays[op] = op.next_delay() if delay is None else delay
+        if self.started and op not in self.tasks:
+            self.tasks[op] = asyncio.ensure_future(
+                self.periodically(op, self.delays[op]))
+
+    def remove(self, op):
+        self.delays.pop(op, None)
+        task = self.tasks.pop(op, None)
+        if task:
+            task.cancel()
+
+    async def perform(self, op):
+        loop = asyncio.get_running_loop()
+        if op.lock.acquire(False):
+            await loop.run_in_executor(None, op.run)
+
+    async def periodically(self, op, delay):
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.perform(op)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception('Failed periodical %r', op)
+            delay = op.next_delay()
+
+    async def start(self, wait=True):
+        self.started = True
+        if isinstance(self.fetcher, PeriodicalOperation):
+            if wait:
+                await self.perform(self.fetcher)
+            self.add(self.fetcher, None if wait else 0)
+        if isinstance(self.fetcher, StreamingFetcher):
+            self.fetcher.connect()
+        for op in list(self.delays):
+            self.add(op, self.delays[op])
+
+    async def close(self):
+        tasks, self.tasks, self.started = self.tasks, {}, False
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if isinstance(self.fetcher, PeriodicalOperation):
+            self.fetcher.stop()
+        if isinstance(self.reporter, Reporter):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.reporter)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
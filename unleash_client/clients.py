@@ -2,9 +2,17 @@ import time
 
 import logging
 
-from .strategy import DEFAULT_STRATEGIES
-from .io import UrlFetcher, Reporter
-from .features import Feature
+from .strategy import (
+    DEFAULT_STRATEGIES, never, cache_normalize, normalize_cache_info,
+)
+from . import io
+from .io import (
+    PeriodicalOperation, UrlFetcher, StreamingFetcher, Reporter,
+    load_bootstrap,
+)
+from .definitions import feature_def
+from .features import Feature, cohort
+from .metrics import Stats
 
 log = logging.getLogger(__name__)
 
@@ -15,6 +23,36 @@ def name_instance():
     return "%s:%s" % (socket.gethostname(), os.getpid())
 
 
+class Scope:
+    __slots__ = ('features', 'context', 'memo')
+
+    def __init__(self, features, context):
+        self.features = features
+        self.context = context
+        self.memo = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def enabled(self, name):
+        hit = self.memo.get(name)
+        if hit is not None:
+            result, counter = hit
+            if counter is not None:
+                next(counter)
+            return result
+        feature = self.features.get(name)
+        if feature is None:
+            self.memo[name] = False, None
+            return False
+        result = feature(self.context)
+        self.memo[name] = result, feature.counters[result]
+        return result
+
+
 class Client:
     def __init__(
             self,
@@ -27,45 +65,160 @@ class Client:
             strategies=DEFAULT_STRATEGIES,
             clock=time.time,
             fetch=None,
+            normalize_cache_size=None,
+            scheduler=None,
+            bootstrap=None,
+            cache_dir=None,
+            session=None,
+            timeout=3.0,
+            metrics_path=None,
+            instrument=None,
+            streaming=False,
+            jitter=0.1,
     ):
         self.url = url
         self.app_name = app_name
         self.instance_id = instance_id or name_instance()
 
         self.strategies = strategies
+        if normalize_cache_size is not None:
+            cache_normalize(normalize_cache_size)
+        self.scheduler = scheduler or io.scheduler
         features_url = url + '/api/features'
-        self.fetch = fetch or UrlFetcher(features_url, refresh_interval)
+        if fetch:
+            self.fetch = fetch
+        elif streaming:
+            self.fetch = StreamingFetcher(
+                features_url,
+                refresh_interval,
+                url + '/api/client/streaming',
+                scheduler=self.scheduler,
+                cache_dir=cache_dir,
+                session=session,
+                timeout=timeout,
+                jitter=jitter,
+            )
+        else:
+            self.fetch = UrlFetcher(
+                features_url,
+                refresh_interval,
+                scheduler=self.scheduler,
+                cache_dir=cache_dir,
+                session=session,
+                timeout=timeout,
+                jitter=jitter,
+            )
         self.defs = {}
         self.features = {}
+        self.instrument = Stats() if instrument is True else instrument
+        if self.instrument:
+            self.enabled = self.timed_enabled
+            if isinstance(self.fetch, UrlFetcher):
+                self.fetch.instrument = self.instrument
+        if bootstrap is not None:
+            self.fetch.warm_up(load_bootstrap(bootstrap))
 
-        if not disable_metrics:
+        if not disable_metrics and metrics_path:
+            from .shared import HostMetrics, HostReporter
+            self.reporter = HostReporter(
+                self,
+                url + '/api/client/metrics',
+                metrics_interval,
+                HostMetrics(metrics_path),
+                clock=clock,
+                scheduler=self.scheduler,
+                session=session,
+                timeout=timeout,
+            )
+            self.reporter.start()
+        elif not disable_metrics:
             self.reporter = Reporter(
                 self,
                 url + '/api/client/metrics',
                 metrics_interval,
                 clock=clock,
+                scheduler=self.scheduler,
+                session=session,
+                timeout=timeout,
+                jitter=jitter,
             )
+            self.reporter.start()
         else:
             self.reporter = lambda *al: None
 
-    def get(self, name):
+    def snapshot(self):
         d = self.fetch()
         if d is not self.defs:
             self.defs = d
-            ts = [Feature(self.strategies, f) for f in d.get('features', [])]
-            self.features = {t.feature['name']: t for t in ts}
-        return self.features.get(name, lambda *al, **kw: False)
+            t0 = time.perf_counter()
+            self.features = self.compile(d.get('features', []))
+            if self.instrument:
+                self.instrument.swapped(time.perf_counter() - t0)
+        return self.features
+
+    def compile(self, definitions):
+        old, features = self.features, {}
+        for f in map(feature_def, definitions):
+            current = old.get(f.name)
+            if current is None:
+                current = Feature(self.strategies, f)
+            elif current.feature != f:
+                current = Feature(self.strategies, f, current.tally)
+            features[f.name] = current
+        return features
+
+    def get(self, name):
+        return self.snapshot().get(name, never)
 
     def enabled(self, name, context):
-        try:
-            return self.get(name)(context)
-        finally:
-            self.reporter()
+        return self.get(name)(context)
+
+    def timed_enabled(self, name, context):
+        t0 = time.perf_counter()
+        result = self.get(name)(context)
+        self.instrument.observe('evaluate_seconds', time.perf_counter() - t0)
+        return result
+
+    def enabled_many(self, names, context):
+        get = self.snapshot().get
+        return {name: get(name, never)(context) for name in names}
+
+    def evaluate_all(self, context):
+        features = self.snapshot()
+        return {name: f(context) for name, f in features.items()}
+
+    def enabled_for(self, name, key_field, values):
+        return cohort(self.snapshot().get(name), key_field, values)
+
+    def scoped(self, context):
+        return Scope(self.snapshot(), context)
+
+    def wait_ready(self, timeout=None):
+        ready = getattr(self.fetch, 'ready', None)
+        return ready.wait(timeout) if ready else True
+
+    def stats(self):
+        return self.instrument() if self.instrument else {}
+
+    @staticmethod
+    def normalize_cache_info():
+        return normalize_cache_info()
 
     def close(self):
+        for op in (self.fetch, self.reporter):
+            if isinstance(op, PeriodicalOperation):
+                op.stop()
         self.reporter()
 
 
 class DummyClient:
     enabled = staticmethod(lambda name, context: False)
+    enabled_many = staticmethod(
+        lambda names, context: dict.fromkeys(names, False))
+    evaluate_all = staticmethod(lambda context: {})
+    enabled_for = staticmethod(
+        lambda name, key_field, values: cohort(None, key_field, values))
+    wait_ready = staticmethod(lambda timeout=None: True)
+    stats = staticmethod(lambda: {})
+    scoped = staticmethod(lambda context: Scope({}, context))
     close = staticmethod(lambda: None)
@@ -0,0 +1,16 @@
+from .util import FrozenDict
+
+
+class UnleashContext(FrozenDict):
+    __slots__ = ()
+
+    def __init__(self, fields=(), **kw):
+        values = dict(fields, **kw)
+        for field in values:
+            if not isinstance(field, str):
+                raise TypeError('Context field must be a string: %r' % field)
+        super().__init__(
+            (field, '%s' % value)
+            for field, value in values.items()
+            if value is not None
+        )
@@ -0,0 +1,90 @@
+import json
+from collections import namedtuple
+from functools import partial
+from operator import itemgetter
+
+from .util import FrozenDict
+
+
+class Definition(tuple):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return tuple.__getitem__(self, key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+class StrategyDef(Definition, namedtuple('_', 'name parameters')):
+    __slots__ = ()
+
+
+class FeatureDef(Definition, namedtuple('_', 'name enabled strategies')):
+    __slots__ = ()
+
+
+_strategy = partial(tuple.__new__, StrategyDef)
+_feature = partial(tuple.__new__, FeatureDef)
+_name = itemgetter('name')
+_parameters = itemgetter('parameters')
+_feature_fields = itemgetter('name', 'enabled', 'strategies')
+
+
+def strategy_defs(strategies):
+    return tuple(map(_strategy, zip(
+        map(_name, strategies),
+        map(FrozenDict, map(_parameters, strategies)),
+    )))
+
+
+def feature_def(f):
+    if type(f) is FeatureDef:
+        return f
+    name, enabled, strategies = _feature_fields(f)
+    return _feature((name, enabled, strategy_defs(strategies)))
+
+
+def load(data):
+    features = tuple(map(feature_def, data.get('features') or ()))
+    return FrozenDict(data, features=features)
+
+
+def consume(data):
+    raw, features = data.pop('features', None) or [], []
+    raw.reverse()
+    while raw:
+        features.append(feature_def(raw.pop()))
+    return FrozenDict(data, features=tuple(features))
+
+
+def merge(definitions, delta):
+    changed = tuple(map(feature_def, delta.get('features') or ()))
+    replaced = {f.name for f in changed}
+    replaced.update(delta.get('removed') or ())
+    kept = tuple(
+        f for f in map(feature_def, definitions.get('features') or ())
+        if f.name not in replaced
+    )
+    return FrozenDict(definitions, features=kept + changed)
+
+
+def decode(payload):
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    return consume(json.loads(payload))
+
+
+def thaw(value):
+    if isinstance(value, Definition):
+        value = value._asdict()
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
@@ -1,5 +1,8 @@
 import logging
 
+from .metrics import Tally
+from .strategy import always, never
+
 log = logging.getLogger(__name__)
 
 
@@ -13,23 +16,74 @@ def feature_gates(strategies, feature):
             tests.append(test)
         else:
             log.warning('Could not find strategy %r%r', name, parameters)
-            tests.append(lambda *a, **k: False)
+            tests.append(never)
     return tests
 
 
+def contextual(gate):
+    if gate is always or gate is never:
+        return gate
+    test = getattr(gate, 'contextual', None)
+    if test is None:
+        return lambda context: bool(gate(**context))
+    return test
+
+
+def gate_cohort(gate, field, keys):
+    cohort = getattr(gate, 'cohort', None)
+    if cohort is None:
+        test = contextual(gate)
+        return bytearray(bool(test({field: k})) for k in keys)
+    return cohort(field, keys)
+
+
+def cohort(feature, field, values):
+    keys = values if hasattr(values, '__len__') else list(values)
+    n = len(keys)
+    hits = 0
+    if feature is not None and feature.enabled:
+        for gate in feature.gates:
+            hits |= int.from_bytes(gate_cohort(gate, field, keys), 'big')
+    return memoryview(bytearray(hits.to_bytes(n, 'big'))).cast('?')
+
+
+def compile_plan(enabled, gates):
+    tests = [contextual(g) for g in gates] if enabled else []
+    if always in tests:
+        return always
+    tests = tuple(t for t in tests if t is not never)
+    if not tests:
+        return never
+    if len(tests) == 1:
+        return tests[0]
+
+    def plan(context):
+        for test in tests:
+            if test(context):
+                return True
+        return False
+    return plan
+
+
 class Feature:
-    def __init__(self, strategies, feature):
+    def __init__(self, strategies, feature, tally=None):
         self.feature = feature
         self.enabled = feature['enabled']
-        self.choices = {False: 0, True: 0}
+        self.tally = tally or Tally()
+        self.counters = self.tally.counters
         self.gates = feature_gates(strategies, feature)
+        self.decide = compile_plan(self.enabled, self.gates)
 
     def __call__(self, context):
-        result = self.enabled and any(g(**context) for g in self.gates)
-        self.choices[result] += 1
+        result = self.enabled and self.decide(context)
+        next(self.counters[result])
         return result
 
+    @property
+    def choices(self):
+        return self.tally.pending()
+
     def report(self):
-        result, self.choices = self.choices, {False: 0, True: 0}
+        result = self.tally.flush()
         log.info('Feature report for %r: %r', self.feature, result)
         return {'yes': result[True], 'no': result[False]}
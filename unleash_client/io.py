@@ -1,136 +1,581 @@
+import collections
 import datetime
+import email.utils
+import gzip
+import hashlib
+import heapq
+import itertools
 import json
 import logging
+import socket
+import tempfile
 import threading
 import time
 
 import os
+import random
 import requests
+from requests.adapters import HTTPAdapter
 
-from .util import FrozenDict
+from .definitions import decode, load, merge
 
 log = logging.getLogger(__name__)
 
 
+class Scheduler:
+    def __init__(self, clock=time.monotonic, background=True):
+        self.clock = clock
+        self.background = background
+        self.queue = []
+        self.ops = set()
+        self.order = itertools.count()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.log = log.getChild(self.__class__.__name__)
+
+    def add(self, op, delay=None):
+        with self.cond:
+            self.ops.add(op)
+            self.push(op, op.next_delay() if delay is None else delay)
+            self.wake()
+
+    def wake(self):
+        if self.background and self.thread is None:
+            self.thread = threading.Thread(
+                target=self.loop,
+                name='unleash-scheduler',
+                daemon=True,
+            )
+            self.thread.start()
+        self.cond.notify()
+
+    def remove(self, op):
+        with self.cond:
+            self.ops.discard(op)
+            self.cond.notify()
+
+    def push(self, op, delay):
+        due = self.clock() + delay
+        heapq.heappush(self.queue, (due, next(self.order), op))
+
+    def run_pending(self):
+        while True:
+            with self.cond:
+                if not self.queue:
+                    return
+                due, _, op = self.queue[0]
+                if op not in self.ops:
+                    heapq.heappop(self.queue)
+                    continue
+                if due > self.clock():
+                    return
+                heapq.heappop(self.queue)
+            # noinspection PyBroadException
+            try:
+                if op.lock.acquire(False):
+                    op.run()
+            except:
+                self.log.exception('Failed running %r', op)
+            # noinspection PyBroadException
+            try:
+                delay = op.next_delay()
+            except:
+                self.log.exception('Failed scheduling %r', op)
+                delay = op.interval
+            with self.cond:
+                if op in self.ops:
+                    self.push(op, delay)
+
+    def after_fork(self):
+        self.cond = threading.Condition()
+        self.thread = None
+        self.ops = {op for op in self.ops if op.forks}
+        for op in self.ops:
+            op.after_fork()
+        if self.ops:
+            with self.cond:
+                self.wake()
+
+    def loop(self):
+        while True:
+            self.run_pending()
+            with self.cond:
+                if not self.ops:
+                    self.thread = None
+                    return
+                if not self.queue:
+                    self.cond.wait()
+                    continue
+                timeout = self.queue[0][0] - self.clock()
+                if timeout > 0:
+                    self.cond.wait(timeout)
+
+
+scheduler = Scheduler()
+
+
+def http_session(pool_size=4):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip'
+    return session
+
+
+_shared = []
+_shared_lock = threading.Lock()
+
+
+def shared_session():
+    if not _shared:
+        with _shared_lock:
+            if not _shared:
+                _shared.append(http_session())
+    return _shared[0]
+
+
+def after_fork():
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    del _shared[:]
+    scheduler.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=after_fork)
+
+
+def retry_after(value):
+    if not value:
+        return 0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0
+    return max(0.0, when.timestamp() - time.time())
+
+
 class PeriodicalOperation:
-    def __init__(self, interval, clock=time.time):
+    forks = True
+
+    def __init__(self, interval, clock=time.time, scheduler=None, jitter=0,
+                 max_backoff=600):
         self.clock = clock
         self.interval = interval
+        self.scheduler = scheduler
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.retry_after = 0
         self.lock = threading.Lock()
         self.last = self.clock()
         self.cache = PeriodicalOperation
+        self.ready = threading.Event()
         self.log = log.getChild(self.__class__.__name__)
 
     def __call__(self):
-        if self.cache == PeriodicalOperation:
-            self.log.debug('first run')
-            self.lock.acquire(True)
-            self.run()
-        now = self.clock()
-        if now >= self.last + self.interval:
-            if self.lock.acquire(False):
-                self.log.info('got lock')
-                threading.Thread(target=self.run).start()
+        if self.cache is PeriodicalOperation:
+            self.first_run()
         return self.cache
 
+    def first_run(self):
+        self.lock.acquire(True)
+        if self.cache is not PeriodicalOperation:
+            self.lock.release()
+            return
+        self.log.debug('first run')
+        self.run()
+        self.start()
+
+    def warm_up(self, cache):
+        self.cache = cache
+        self.start(0)
+
+    def next_delay(self):
+        delay = self.interval
+        if self.failures:
+            backoff = delay * 2 ** min(self.failures, 16)
+            delay = max(delay, min(backoff, self.max_backoff))
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * random.random() - 1)
+        delay, self.retry_after = max(delay, self.retry_after), 0
+        return delay
+
+    def start(self, delay=None):
+        (self.scheduler or scheduler).add(self, delay)
+
+    def after_fork(self):
+        self.lock = threading.Lock()
+
+    def stop(self):
+        (self.scheduler or scheduler).remove(self)
+
+    def run(self):
+        try:
+            return self.step()
+        finally:
+            self.lock.release()
+
+
+def cache_path(cache_dir, url):
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'unleash-%s.json' % name)
+
 
 class UrlFetcher(PeriodicalOperation):
-    def __init__(self, url, interval, clock=time.time):
-        super().__init__(interval, clock)
+    instrument = None
+
+    def __init__(
+            self, url, interval, clock=time.time, scheduler=None,
+            cache_dir=None, session=None, timeout=3.0, jitter=0,
+            max_backoff=600,
+    ):
+        super().__init__(interval, clock, scheduler, jitter, max_backoff)
         self.url = url
         self.etag = ''
+        self.session = session
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_path = cache_dir and cache_path(cache_dir, url)
 
-    def run(self):
+    def warm_up(self, cache):
+        super().warm_up(self.restore(cache))
+
+    def restore(self, default):
+        if not self.cache_path:
+            return default
+        try:
+            with open(self.cache_path, 'rb') as fh:
+                saved = json.load(fh)
+            self.etag, features = saved['etag'], load(saved['features'])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.log.info("No usable cache at %r", self.cache_path)
+            return default
+        self.log.debug("Restored %r from %r", self.etag, self.cache_path)
+        return features
+
+    def save(self, etag, content):
+        if not self.cache_path:
+            return
+        # noinspection PyBroadException
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    fh.write(b'{"etag": %s, "features": %s}' % (
+                        json.dumps(etag).encode('utf-8'), content,
+                    ))
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, self.cache_path)
+            except:
+                os.unlink(tmp)
+                raise
+        except:
+            self.log.warning(
+                "Failed to save %r", self.cache_path, exc_info=True)
+
+    def step(self):
+        if self.cache is PeriodicalOperation:
+            self.cache = self.restore(PeriodicalOperation)
+        instrument = self.instrument
         # noinspection PyBroadException
         try:
             self.log.debug("ETag: %r", self.etag)
             headers = {'If-None-Match': self.etag}
-            res = requests.get(url=self.url, headers=headers, timeout=3.0)
+            session = self.session or shared_session()
+            t0 = time.perf_counter()
+            res = session.get(
+                url=self.url, headers=headers, timeout=self.timeout)
+            t1 = time.perf_counter()
+            if instrument:
+                instrument.count('fetches')
+                instrument.observe('fetch_seconds', t1 - t0)
 
             if res.status_code == 304:
                 self.log.debug("use cached value")
+                if instrument:
+                    instrument.count('not_modified')
+                self.failures = 0
+                self.ready.set()
                 return self.cache
             elif res.ok:
                 self.log.debug("unpack new value")
                 self.etag = res.headers['ETag']
-                self.cache = res.json(object_hook=FrozenDict)
+                self.cache = decode(res.content)
+                if instrument:
+                    t2 = time.perf_counter()
+                    instrument.observe('parse_seconds', t2 - t1)
+                    instrument.count('payload_bytes', len(res.content))
+                self.save(self.etag, res.content)
+                self.failures = 0
+                self.ready.set()
                 return self.cache
             else:
+                self.retry_after = retry_after(res.headers.get('Retry-After'))
                 res.raise_for_status()
         except:
             if log.isEnabledFor(logging.DEBUG):
                 log.debug("Exception fetching %r", self.url, exc_info=True)
             else:
                 log.info("Exception fetching %r", self.url)
+            if instrument:
+                instrument.count('errors')
+            self.failures += 1
 
             if self.cache is PeriodicalOperation:
                 self.cache = {}
             return self.cache
         finally:
             self.last = self.clock()
-            self.lock.release()
+
+
+class StreamingFetcher(UrlFetcher):
+    def __init__(
+            self, url, interval, stream_url, clock=time.time, scheduler=None,
+            cache_dir=None, session=None, timeout=3.0, jitter=0,
+            max_backoff=600, read_timeout=90, retry=1, max_retry=60,
+    ):
+        super().__init__(url, interval, clock, scheduler, cache_dir, session,
+                         timeout, jitter, max_backoff)
+        self.stream_url = stream_url
+        self.read_timeout = read_timeout
+        self.retry = retry
+        self.max_retry = max_retry
+        self.event_id = None
+        self.response = None
+        self.thread = None
+        self.connected = threading.Event()
+        self.stopped = threading.Event()
+        self.updating = threading.Lock()
+
+    def start(self, delay=None):
+        super().start(delay)
+        self.connect()
+
+    def connect(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(
+                target=self.listen,
+                name='unleash-stream',
+                daemon=True,
+            )
+            self.thread.start()
+
+    def stop(self):
+        super().stop()
+        self.stopped.set()
+        self.thread = None
+        raw = getattr(self.response, 'raw', None)
+        sock = getattr(getattr(raw, 'connection', None), 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def after_fork(self):
+        super().after_fork()
+        self.updating = threading.Lock()
+        self.connected = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = self.response = None
+        self.connect()
+
+    def step(self):
+        with self.updating:
+            if self.connected.is_set():
+                return self.cache
+            return super().step()
+
+    def listen(self):
+        failures = 0
+        while not self.stopped.is_set():
+            # noinspection PyBroadException
+            try:
+                self.consume()
+            except:
+                self.log.info("Stream from %r failed", self.stream_url,
+                              exc_info=self.log.isEnabledFor(logging.DEBUG))
+            if self.connected.is_set():
+                failures = 0
+            self.connected.clear()
+            self.response = None
+            failures += 1
+            backoff = self.retry * 2 ** (failures - 1)
+            self.stopped.wait(min(backoff, self.max_retry))
+
+    def consume(self):
+        headers = {'Accept': 'text/event-stream'}
+        if self.event_id:
+            headers['Last-Event-ID'] = self.event_id
+        session = self.session or shared_session()
+        with session.get(self.stream_url, headers=headers, stream=True,
+                         timeout=(self.timeout, self.read_timeout)) as res:
+            res.raise_for_status()
+            self.response = res
+            event, data = 'message', []
+            for line in res.iter_lines(chunk_size=None, decode_unicode=True):
+                if self.stopped.is_set():
+                    return
+                if not line:
+                    if data:
+                        self.dispatch(event, '\n'.join(data))
+                    event, data = 'message', []
+                    continue
+                field, _, value = line.partition(':')
+                if value.startswith(' '):
+                    value = value[1:]
+                if field == 'event':
+                    event = value
+                elif field == 'data':
+                    data.append(value)
+                elif field == 'id':
+                    self.event_id = value
+
+    def dispatch(self, event, data):
+        if event not in ('features', 'message', 'delta'):
+            return
+        with self.updating:
+            if event == 'delta':
+                self.cache = merge(self.cache, json.loads(data))
+            else:
+                self.cache = decode(data)
+        self.log.debug("Applied %r event", event)
+        self.connected.set()
+        self.ready.set()
+
+
+def merge_buckets(buckets):
+    if len(buckets) == 1:
+        return buckets[0]
+    toggles = {}
+    for _, _, bucket in buckets:
+        for name, counts in bucket.items():
+            merged = toggles.setdefault(name, {'yes': 0, 'no': 0})
+            merged['yes'] += counts['yes']
+            merged['no'] += counts['no']
+    return buckets[0][0], buckets[-1][1], toggles
 
 
 class Reporter(PeriodicalOperation):
-    def __init__(self, client, url, interval, clock=time.time):
-        super().__init__(interval, clock)
+    def __init__(
+            self, client, url, interval, clock=time.time, scheduler=None,
+            session=None, timeout=3.0, buffered=20, jitter=0,
+            max_backoff=600,
+    ):
+        super().__init__(interval, clock, scheduler, jitter, max_backoff)
         self.cache = None
         self.client = client
         self.url = url
+        self.session = session
+        self.timeout = timeout
+        self.buffer = collections.deque(maxlen=buffered)
+
+    def __call__(self):
+        self.lock.acquire(True)
+        return self.run()
 
     @staticmethod
     def fmt_time(t):
         return datetime.datetime.fromtimestamp(t).strftime('%FT%TZ')
 
-    def run(self):
-        # noinspection PyBroadException
-        try:
-            now = self.clock()
-            start, stop, self.last = self.last, now, now
-            bucket = {
+    def report(self, start, stop, toggles):
+        return {
+            "appName": self.client.app_name,
+            "instanceId": self.client.instance_id,
+            "bucket": {
                 'start': self.fmt_time(start),
                 'stop': self.fmt_time(stop),
-                'toggles': {
-                    name: feature.report()
-                    for name, feature in self.client.features.items()
-                },
-            }
-
-            report = {
-                "appName": self.client.app_name,
-                "instanceId": self.client.instance_id,
-                "bucket": bucket,
-            }
-            self.log.info('%r', report)
-            res = requests.post(self.url, json=report)
-            self.log.info('%r', res.status_code)
+                'toggles': toggles,
+            },
+        }
+
+    def post(self, report):
+        self.log.info('%r', report)
+        body = gzip.compress(json.dumps(report).encode('utf-8'))
+        session = self.session or shared_session()
+        res = session.post(self.url, data=body, timeout=self.timeout,
+                           headers={
+                               'Content-Type': 'application/json',
+                               'Content-Encoding': 'gzip',
+                           })
+        self.log.info('%r', res.status_code)
+        return res
+
+    def collect(self, now):
+        start, self.last = self.last, now
+        toggles = {}
+        for name, feature in self.client.features.items():
+            counts = feature.report()
+            if counts['yes'] or counts['no']:
+                toggles[name] = counts
+        if not toggles:
+            return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.log.warning('Dropping unsent metrics from %s',
+                             self.fmt_time(self.buffer[0][0]))
+        self.buffer.append((start, now, toggles))
+
+    def step(self):
+        now = self.clock()
+        self.collect(now)
+        if not self.buffer:
+            return
+        # noinspection PyBroadException
+        try:
+            res = self.post(self.report(*merge_buckets(self.buffer)))
+            ok = res.ok
+            if not ok:
+                self.retry_after = retry_after(res.headers.get('Retry-After'))
         except:
-            pass
-        finally:
-            self.lock.release()
+            self.log.info('Failed to post metrics', exc_info=True)
+            ok = False
+        if ok:
+            self.buffer.clear()
+            self.failures = 0
+        else:
+            self.failures += 1
 
 
-class FileFetcher:
+def load_bootstrap(source):
+    if isinstance(source, dict):
+        return load(source)
+    with open(source) as fh:
+        return load(json.load(fh))
+
+
+class FileFetcher(PeriodicalOperation):
     open_f = open
     stat_f = os.stat
 
-    def __init__(self, path):
-        self.cache = {}
+    def __init__(self, path, interval=1, clock=time.time, scheduler=None):
+        super().__init__(interval, clock, scheduler)
         self.path = path
-        self.last = 0
+        self.mtime = 0
 
-    def __call__(self):
+    def step(self):
         # noinspection PyBroadException
         try:
             st = self.stat_f(self.path)
-            if st.st_mtime > self.last:
+            if st.st_mtime > self.mtime:
                 with self.open_f(self.path) as fh:
-                    self.cache = json.load(fh)
-                self.last = st.st_mtime
+                    self.cache = load(json.load(fh))
+                self.mtime = st.st_mtime
+            self.ready.set()
         except:
             if log.isEnabledFor(logging.DEBUG):
                 log.debug("Failed to read %r", self.path, exc_info=True)
             else:
-                log.info("Failed to read %r")
+                log.info("Failed to read %r", self.path)
         finally:
+            if self.cache is PeriodicalOperation:
+                self.cache = {}
             return self.cache
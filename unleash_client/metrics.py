@@ -0,0 +1,114 @@
+import threading
+import time
+from bisect import bisect_left
+from itertools import count
+
+BOUNDS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5))
+
+
+class Tally:
+    __slots__ = ('counters', 'reads', 'reported', 'lock')
+
+    def __init__(self):
+        self.counters = (count(), count())
+        self.reads = 0
+        self.reported = (0, 0)
+        self.lock = threading.Lock()
+
+    def __call__(self, result):
+        next(self.counters[result])
+
+    def read(self):
+        # next() is the only documented way to read a count(). Every read
+        # takes one value from each counter, so subtract the earlier reads.
+        no, yes = next(self.counters[0]), next(self.counters[1])
+        reads, self.reads = self.reads, self.reads + 1
+        return no - reads, yes - reads
+
+    def unreported(self):
+        (no, yes), (was_no, was_yes) = self.read(), self.reported
+        return {False: no - was_no, True: yes - was_yes}
+
+    def totals(self):
+        with self.lock:
+            return self.read()
+
+    def pending(self):
+        with self.lock:
+            return self.unreported()
+
+    def flush(self):
+        with self.lock:
+            result = self.unreported()
+            self.reported = (
+                self.reported[0] + result[False],
+                self.reported[1] + result[True],
+            )
+        return result
+
+
+class Histogram:
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BOUNDS, seconds)] += 1
+        self.total += seconds
+
+    def summary(self):
+        buckets, seen = {}, 0
+        for bound, n in zip(BOUNDS, self.counts):
+            seen += n
+            buckets['%g' % bound] = seen
+        seen += self.counts[-1]
+        buckets['+Inf'] = seen
+        return {'count': seen, 'sum': self.total, 'buckets': buckets}
+
+
+class Stats:
+    counters = ('fetches', 'not_modified', 'errors', 'swaps', 'payload_bytes')
+
+    def __init__(self, hooks=(), clock=time.monotonic):
+        self.hooks = tuple(hooks)
+        self.clock = clock
+        self.counts = dict.fromkeys(self.counters, 0)
+        self.latencies = {}
+        self.swapped_at = None
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+        for hook in self.hooks:
+            hook(name, n)
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = Histogram()
+            histogram.observe(seconds)
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def swapped(self, seconds):
+        self.swapped_at = self.clock()
+        self.count('swaps')
+        self.observe('compile_seconds', seconds)
+
+    def __call__(self):
+        with self.lock:
+            age = None
+            if self.swapped_at is not None:
+                age = self.clock() - self.swapped_at
+            return {
+                'counters': dict(self.counts),
+                'latencies': {
+                    name: histogram.summary()
+                    for name, histogram in self.latencies.items()
+                },
+                'snapshot_age': age,
+            }
@@ -0,0 +1,366 @@
+import fcntl
+import logging
+import marshal
+import mmap
+import os
+import socket
+import struct
+import time
+
+from .definitions import load, thaw
+from .io import PeriodicalOperation, Reporter
+
+log = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<4s4xQQ')
+MAGIC = b'UNL1'
+OFFSET = 32
+
+
+class SnapshotWriter:
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self.fd).st_size
+        if size < mmap.PAGESIZE:
+            size = mmap.PAGESIZE
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.locked = False
+        self.acquire()
+
+    def acquire(self):
+        if not self.locked:
+            try:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            self.locked = True
+            if HEADER.unpack_from(self.map)[0] != MAGIC:
+                HEADER.pack_into(self.map, 0, MAGIC, 0, 0)
+        return True
+
+    def grow(self, need):
+        size = len(self.map)
+        while size < need:
+            size *= 2
+        os.ftruncate(self.fd, size)
+        self.map.close()
+        self.map = mmap.mmap(self.fd, size)
+
+    def publish(self, definitions):
+        if not self.acquire():
+            return None
+        payload = marshal.dumps(thaw(definitions))
+        end = OFFSET + len(payload)
+        if end > len(self.map):
+            self.grow(end)
+        _, seq, _ = HEADER.unpack_from(self.map)
+        begin = seq + 1 + (seq & 1)
+        HEADER.pack_into(self.map, 0, MAGIC, begin, 0)
+        self.map[OFFSET:end] = payload
+        HEADER.pack_into(self.map, 0, MAGIC, begin + 1, len(payload))
+        return begin + 1
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.seq = None
+
+    def open(self):
+        if self.map is not None:
+            self.map.close()
+        with open(self.path, 'rb') as fh:
+            self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self):
+        if self.map is None:
+            self.open()
+        magic, seq, length = HEADER.unpack_from(self.map)
+        if magic != MAGIC or seq & 1 or seq == self.seq:
+            return None
+        if OFFSET + length > len(self.map):
+            self.open()
+        payload = self.map[OFFSET:OFFSET + length]
+        if HEADER.unpack_from(self.map)[1] != seq:
+            return None
+        try:
+            definitions = marshal.loads(payload)
+        except (EOFError, ValueError, TypeError):
+            return None
+        self.seq = seq
+        return definitions
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+class MmapFetcher(PeriodicalOperation):
+    def __init__(self, path, interval=1, clock=time.time, scheduler=None):
+        super().__init__(interval, clock, scheduler)
+        self.reader = SnapshotReader(path)
+
+    def step(self):
+        try:
+            definitions = self.reader.read()
+            if definitions is not None:
+                self.cache = load(definitions)
+            if self.reader.seq is not None:
+                self.ready.set()
+        except OSError:
+            self.log.info("Failed to map %r", self.reader.path)
+        if self.cache is PeriodicalOperation:
+            self.cache = {}
+        return self.cache
+
+
+class SnapshotPublisher(PeriodicalOperation):
+    forks = False
+
+    def __init__(self, fetch, path, interval=1, clock=time.time,
+                 scheduler=None):
+        super().__init__(interval, clock, scheduler)
+        self.fetch = fetch
+        if isinstance(fetch, PeriodicalOperation):
+            fetch.forks = False
+        self.writer = SnapshotWriter(path)
+        self.pid = os.getpid()
+        self.cache = None
+
+    def step(self):
+        if os.getpid() != self.pid:
+            self.stop()
+            if isinstance(self.fetch, PeriodicalOperation):
+                self.fetch.stop()
+            return
+        definitions = self.fetch()
+        if definitions is not self.cache:
+            seq = self.writer.publish(definitions)
+            if seq is None:
+                self.log.warning(
+                    "%r is locked by another publisher", self.writer.path)
+                return
+            self.log.debug("Published snapshot %d", seq)
+            self.cache = definitions
+        self.ready.set()
+
+
+METRICS = struct.Struct('<4s4xQQ')
+METRICS_MAGIC = b'UNM1'
+SLOT = struct.Struct('<QQ')
+COUNTS = struct.Struct('<QQ')
+ENTRY = struct.Struct('<QQQQ')
+NAME = 224
+ENTRY_SIZE = NAME + ENTRY.size
+ELECTION, CLAIM = 0, 1
+
+
+class HostMetrics:
+    def __init__(self, path, slots=64, capacity=256):
+        self.path = path
+        self.slots = slots
+        self.capacity = capacity
+        self.pid = None
+        self.fd = None
+        self.map = None
+        self.slot = None
+        self.index = {}
+        self.elected = False
+
+    @property
+    def slot_size(self):
+        return SLOT.size + self.capacity * ENTRY_SIZE
+
+    def offsets(self):
+        return [OFFSET + i * self.slot_size for i in range(self.slots)]
+
+    def lock(self, start, block=False):
+        flags = fcntl.LOCK_EX if block else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.lockf(self.fd, flags, 1, start)
+            return True
+        except OSError:
+            return False
+
+    def unlock(self, start):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, start)
+
+    def open(self):
+        if self.pid == os.getpid():
+            return self.slot is not None
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.lock(CLAIM, block=True)
+        try:
+            magic, slots, capacity = METRICS.unpack_from(
+                os.pread(self.fd, METRICS.size, 0).ljust(METRICS.size, b'\0'))
+            if magic == METRICS_MAGIC:
+                self.slots, self.capacity = slots, capacity
+            size = OFFSET + self.slots * self.slot_size
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+            self.map = mmap.mmap(self.fd, size)
+            METRICS.pack_into(
+                self.map, 0, METRICS_MAGIC, self.slots, self.capacity)
+            self.slot = self.claim()
+        finally:
+            self.unlock(CLAIM)
+        self.pid = os.getpid()
+        self.index = {}
+        self.elected = False
+        if self.slot is None:
+            log.warning('No free metrics slot in %r', self.path)
+        return self.slot is not None
+
+    def claim(self):
+        for offset in self.offsets():
+            pid, _ = SLOT.unpack_from(self.map, offset)
+            if pid == 0 and self.lock(offset):
+                SLOT.pack_into(self.map, offset, os.getpid(), 0)
+                return offset
+        return None
+
+    def entry(self, name):
+        offset = self.index.get(name)
+        if offset is not None:
+            return offset
+        encoded = name.encode('utf-8')
+        _, used = SLOT.unpack_from(self.map, self.slot)
+        if len(encoded) > NAME or used >= self.capacity:
+            log.warning('Cannot count %r in %r', name, self.path)
+            return None
+        offset = self.slot + SLOT.size + used * ENTRY_SIZE
+        self.map[offset:offset + NAME] = encoded.ljust(NAME, b'\0')
+        ENTRY.pack_into(self.map, offset + NAME, 0, 0, 0, 0)
+        SLOT.pack_into(self.map, self.slot, os.getpid(), used + 1)
+        self.index[name] = offset
+        return offset
+
+    def sync(self, features):
+        if not self.open():
+            return
+        for name, feature in features.items():
+            pending = feature.tally.pending()
+            if not (pending[True] or pending[False]):
+                continue
+            offset = self.entry(name)
+            if offset is None:
+                continue
+            delta = feature.tally.flush()
+            yes, no = COUNTS.unpack_from(self.map, offset + NAME)
+            COUNTS.pack_into(self.map, offset + NAME,
+                             yes + delta[True], no + delta[False])
+
+    def elect(self):
+        if self.open() and not self.elected:
+            self.elected = self.lock(ELECTION)
+        return self.elected
+
+    def harvest(self):
+        toggles, seen, dead = {}, [], []
+        for slot in self.offsets():
+            pid, used = SLOT.unpack_from(self.map, slot)
+            if pid == 0:
+                continue
+            if pid != os.getpid() and self.lock(slot):
+                dead.append(slot)
+            for i in range(min(used, self.capacity)):
+                offset = slot + SLOT.size + i * ENTRY_SIZE
+                name = self.map[offset:offset + NAME].rstrip(b'\0')
+                yes, no, was_yes, was_no = ENTRY.unpack_from(
+                    self.map, offset + NAME)
+                seen.append((offset, yes, no, was_yes, was_no))
+                if yes == was_yes and no == was_no:
+                    continue
+                counts = toggles.setdefault(
+                    name.decode('utf-8'), {'yes': 0, 'no': 0})
+                counts['yes'] += yes - was_yes
+                counts['no'] += no - was_no
+        return toggles, seen, dead
+
+    def commit(self, seen, dead):
+        for offset, yes, no, _, _ in seen:
+            COUNTS.pack_into(self.map, offset + NAME + COUNTS.size, yes, no)
+        self.release(dead, clear=True)
+
+    def release(self, dead, clear=False):
+        if clear and dead:
+            self.lock(CLAIM, block=True)
+            try:
+                for slot in dead:
+                    SLOT.pack_into(self.map, slot, 0, 0)
+            finally:
+                self.unlock(CLAIM)
+        for slot in dead:
+            self.unlock(slot)
+
+    def close(self):
+        if self.pid != os.getpid():
+            return
+        self.map.close()
+        os.close(self.fd)
+        self.pid = self.map = self.fd = self.slot = None
+        self.elected = False
+
+
+class HostReporter(Reporter):
+    def __init__(self, client, url, interval, metrics, sync_interval=1,
+                 clock=time.time, scheduler=None, session=None,
+                 timeout=3.0):
+        super().__init__(client, url, sync_interval, clock, scheduler,
+                         session, timeout)
+        self.metrics = metrics
+        self.report_interval = interval
+        self.final = False
+
+    def __call__(self):
+        self.lock.acquire(True)
+        self.final = True
+        try:
+            return self.run()
+        finally:
+            self.final = False
+
+    def report(self, start, stop, toggles):
+        report = super().report(start, stop, toggles)
+        report['instanceId'] = socket.gethostname()
+        return report
+
+    def step(self):
+        # noinspection PyBroadException
+        try:
+            self.metrics.sync(self.client.features)
+            now = self.clock()
+            due = self.final or now >= self.last + self.report_interval
+            if due and self.metrics.elect():
+                self.flush(now)
+        except:
+            self.log.info('Failed to report metrics', exc_info=True)
+        finally:
+            if self.final:
+                self.metrics.close()
+
+    def flush(self, now):
+        toggles, seen, dead = self.metrics.harvest()
+        if not toggles:
+            self.metrics.commit(seen, dead)
+            self.last = now
+            return
+        try:
+            res = self.post(self.report(self.last, now, toggles))
+            ok = res.ok
+        except:
+            self.metrics.release(dead)
+            raise
+        if ok:
+            self.metrics.commit(seen, dead)
+            self.last = now
+        else:
+            self.metrics.release(dead)
@@ -1,19 +1,69 @@
+import ipaddress
+import logging
 import random
+import socket
+import weakref
+from functools import lru_cache
 from hashlib import md5
 
+from .trie import PrefixTrie
 from .util import FrozenDict
 
+log = logging.getLogger(__name__)
 
-def normalize(key, group):
-    value = '%s:%s' % (group, key)
-    end = md5(value.encode('utf-8')).hexdigest()[-4:]
-    return int(end, 16) % 100
+
+def always(context=None, *al, **kw):
+    return True
+
+
+def never(context=None, *al, **kw):
+    return False
+
+
+def bucket(key, group):
+    d = md5(('%s:%s' % (group, key)).encode('utf-8')).digest()
+    return ((d[14] << 8) | d[15]) % 100
+
+
+normalize = bucket
+
+
+def cache_normalize(size):
+    global normalize
+    normalize = lru_cache(maxsize=size)(bucket) if size else bucket
+    return normalize
+
+
+def normalize_cache_info():
+    info = getattr(normalize, 'cache_info', None)
+    return info and info()
+
+
+def normalize_many(keys, group):
+    base = md5(('%s:' % group).encode('utf-8'))
+    result = bytearray()
+    append = result.append
+    for key in keys:
+        h = base.copy()
+        h.update(('%s' % key).encode('utf-8'))
+        d = h.digest()
+        append(((d[14] << 8) | d[15]) % 100)
+    return result
+
+
+def below(percentage):
+    return bytes(int(i < percentage) for i in range(256))
 
 
 class Default:
+    contextual = staticmethod(always)
+
     def __call__(self, **kw):
         return True
 
+    def cohort(self, field, keys):
+        return b'\x01' * len(keys)
+
 
 class GradualRolloutRandom:
     die = random.randint
@@ -24,20 +74,79 @@ class GradualRolloutRandom:
     def __call__(self, **kw):
         return self.die(0, 99) < self.percentage
 
+    def contextual(self, context):
+        return self.die(0, 99) < self.percentage
+
+    def cohort(self, field, keys):
+        return bytearray(self.die(0, 99) < self.percentage for _ in keys)
+
+
+class GradualRollout:
+    __slots__ = ('key', 'group_id', 'percentage')
+
+    def __init__(self, key, group_id, percentage):
+        self.key = key
+        self.group_id = group_id
+        self.percentage = percentage
+
+    def __call__(self, anonymous_arg='', **kw):
+        return self.test({self.key: kw.get(self.key, anonymous_arg)})
+
+    @property
+    def contextual(self):
+        if self.percentage >= 100:
+            return always
+        elif self.percentage <= 0:
+            return never
+        return self.test
+
+    def test(self, context):
+        norm = normalize(context.get(self.key, ''), self.group_id)
+        return norm < self.percentage
+
+    def cohort(self, field, keys):
+        if field != self.key:
+            return bytes([self.contextual({})]) * len(keys)
+        return normalize_many(keys, self.group_id).translate(
+            below(self.percentage))
+
 
 class GradualRolloutFactory:
     def __init__(self, key):
         self.key = key
 
     def __call__(self, groupId, percentage):
-        def test(anonymous_arg='', **kw):
-            key = kw.get(test.key, anonymous_arg)
-            norm = normalize(key, test.group_id)
-            return norm < test.percentage
-        test.key = self.key
-        test.group_id = groupId
-        test.percentage = int(percentage or '0')
-        return test
+        return GradualRollout(self.key, groupId, int(percentage or '0'))
+
+
+_member_sets = weakref.WeakValueDictionary()
+
+
+def member_set(raw):
+    found = _member_sets.get(raw)
+    if found is None:
+        found = _member_sets.setdefault(raw, frozenset(raw.split(',')))
+    return found
+
+
+class ExplicitSet:
+    __slots__ = ('key', 'members')
+
+    def __init__(self, key, members):
+        self.key = key
+        self.members = members
+
+    def __call__(self, anonymous_arg='', **kw):
+        return kw.get(self.key, anonymous_arg) in self.members
+
+    def contextual(self, context):
+        return context.get(self.key, '') in self.members
+
+    def cohort(self, field, keys):
+        members = self.members
+        if field != self.key:
+            return bytes(['' in members]) * len(keys)
+        return bytearray(k in members for k in keys)
 
 
 class ExplicitSetFactory:
@@ -46,12 +155,67 @@ class ExplicitSetFactory:
         self.key = key or parameter
 
     def __call__(self, members='', **kw):
-        def test(anonymous_arg='', **kw):
-            key = kw.get(test.key, anonymous_arg)
-            return key in test.members
-        test.key = self.key
-        test.members = set(kw.get(self.parameter, members).split(','))
-        return test
+        members = member_set(kw.get(self.parameter, members))
+        return ExplicitSet(self.key, members)
+
+
+def packed_address(value):
+    try:
+        return socket.inet_pton(socket.AF_INET, value)
+    except (OSError, TypeError):
+        pass
+    try:
+        return socket.inet_pton(socket.AF_INET6, value)
+    except (OSError, TypeError):
+        return None
+
+
+class AddressSet(ExplicitSet):
+    __slots__ = ('v4', 'v6')
+
+    def __init__(self, key, members, v4, v6):
+        super().__init__(key, members)
+        self.v4 = v4
+        self.v6 = v6
+
+    def __call__(self, anonymous_arg='', **kw):
+        return self.match(kw.get(self.key, anonymous_arg))
+
+    def contextual(self, context):
+        return self.match(context.get(self.key, ''))
+
+    def match(self, value):
+        if value in self.members:
+            return True
+        packed = packed_address(value)
+        if packed is None:
+            return False
+        return packed in (self.v4 if len(packed) == 4 else self.v6)
+
+    def cohort(self, field, keys):
+        if field != self.key:
+            return bytes([self.match('')]) * len(keys)
+        return bytearray(map(self.match, keys))
+
+
+class AddressSetFactory(ExplicitSetFactory):
+    def __call__(self, members='', **kw):
+        members = member_set(kw.get(self.parameter, members))
+        ranges = {m for m in members if '/' in m}
+        if not ranges:
+            return ExplicitSet(self.key, members)
+        networks = []
+        for r in ranges:
+            try:
+                networks.append(ipaddress.ip_network(r.strip(), strict=False))
+            except ValueError:
+                log.warning('Ignoring invalid address range %r', r)
+        return AddressSet(
+            self.key,
+            members - ranges,
+            PrefixTrie(n for n in networks if n.version == 4),
+            PrefixTrie(n for n in networks if n.version == 6),
+        )
 
 
 DEFAULT_STRATEGIES = FrozenDict(**{
@@ -60,6 +224,6 @@ DEFAULT_STRATEGIES = FrozenDict(**{
     'gradualRolloutRandom': GradualRolloutRandom,
     'gradualRolloutSessionId': GradualRolloutFactory('session_id'),
     'gradualRolloutUserId': GradualRolloutFactory('user_id'),
-    'remoteAddress': ExplicitSetFactory('IPs', 'remote_addr'),
+    'remoteAddress': AddressSetFactory('IPs', 'remote_addr'),
     'userWithId': ExplicitSetFactory('userIds', 'user_id'),
 })
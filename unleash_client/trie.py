@@ -0,0 +1,43 @@
+MATCHED = (True, None)
+
+
+class PrefixTrie:
+    __slots__ = ('root', 'everything')
+
+    def __init__(self, networks=()):
+        self.root = {}
+        self.everything = False
+        for network in networks:
+            self.add(network.network_address.packed, network.prefixlen)
+
+    def add(self, packed, prefixlen):
+        if prefixlen == 0:
+            self.everything = True
+            return
+        full, node = (prefixlen - 1) // 8, self.root
+        for byte in packed[:full]:
+            entry = node.get(byte)
+            if entry is None:
+                entry = node[byte] = (False, {})
+            elif entry[0]:
+                return
+            node = entry[1]
+        span = 1 << (8 * (full + 1) - prefixlen)
+        base = packed[full] & -span
+        node.update(dict.fromkeys(range(base, base + span), MATCHED))
+
+    def __contains__(self, packed):
+        if self.everything:
+            return True
+        node = self.root
+        for byte in packed:
+            entry = node.get(byte)
+            if entry is None:
+                return False
+            if entry[0]:
+                return True
+            node = entry[1]
+        return False
+
+    def __bool__(self):
+        return self.everything or bool(self.root)
@@ -1,3 +1,4 @@
 class FrozenDict(dict):
+    __slots__ = ()
     __delitem__ = __setitem__ = NotImplemented
     clear = pop = popitem = setdefault = update = NotImplemented